@@ -30,10 +30,18 @@ Zapisuje wynik DO TEGO SAMEGO PLIKU, który podasz w argumencie.
 from __future__ import annotations
 
 import argparse
+import functools
+import re
 from pathlib import Path
 import unicodedata
 import pandas as pd
-import math
+
+# opcjonalne przyspieszenie normalizacji (kernele C zamiast pętli po komórkach)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
 
 
 ADDR_COLS = ["Województwo", "Powiat", "Gmina", "Miejscowość", "Dzielnica"]
@@ -53,19 +61,51 @@ PLACE_GENERIC_WORDS = {
 
 # ---------- Helpery ----------
 
+# jedno przejście regexem zamiast pętli while po podwójnych spacjach
+_WS_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1 << 18)
 def _norm(s: str) -> str:
-    """Normalizacja do dopasowań (bez ogonków, małe litery, jedna spacja)."""
+    """
+    Normalizacja do dopasowań (bez ogonków, małe litery, jedna spacja).
+    Cache'owana – te same nazwy (województwa, miasta) wracają tysiące razy.
+    """
     s = str(s or "").strip().lower()
     s = "".join(
         ch
         for ch in unicodedata.normalize("NFKD", s)
         if not unicodedata.combining(ch)
     )
-    while "  " in s:
-        s = s.replace("  ", " ")
-    return s
+    return _WS_RE.sub(" ", s)
+
+
+def _norm_series(s: pd.Series) -> pd.Series:
+    """
+    Wektorowy odpowiednik _norm dla całej kolumny (pracuje w C, nie w pętli).
+    Uwaga: usuwamy tylko znaki łączące (jak w _norm) – 'ł' nie ma dekompozycji
+    NFKD, więc encode('ascii','ignore') zgubiłoby je całkiem.
+    """
+    if pc is not None:
+        a = pa.array(s.fillna("").astype(str), type=pa.string())
+        a = pc.utf8_normalize(pc.utf8_lower(pc.utf8_trim_whitespace(a)), form="NFKD")
+        a = pc.replace_substring_regex(a, pattern=r"[\x{0300}-\x{036f}]", replacement="")
+        a = pc.replace_substring_regex(a, pattern=r"\s+", replacement=" ")
+        # to_pandas() ma świeży RangeIndex – bierzemy gołe wartości, inaczej
+        # konstruktor Series dopasuje je po etykietach i pomiesza wiersze
+        return pd.Series(a.to_pandas().to_numpy(), index=s.index, dtype="string")
+    return (
+        s.fillna("")
+        .astype("string")
+        .str.strip()
+        .str.lower()
+        .str.normalize("NFKD")
+        .str.replace("[\u0300-\u036f]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+    )
 
 
+@functools.lru_cache(maxsize=1 << 18)
 def _place_base(s: str) -> str:
     """
     Uproszczony klucz nazwy miejscowości/gminy do porównań:
@@ -79,25 +119,41 @@ def _place_base(s: str) -> str:
     return " ".join(words) if words else s_norm
 
 
+def _read_excel(path, **kwargs) -> pd.DataFrame:
+    """
+    Czyta xlsx szybkim silnikiem calamine, jeśli jest zainstalowany
+    (pandas >= 2.2); w przeciwnym razie zwykłym openpyxl.
+    """
+    try:
+        return pd.read_excel(path, engine="calamine", **kwargs)
+    except (ImportError, ValueError):
+        return pd.read_excel(path, **kwargs)
+
+
 def _is_missing(v) -> bool:
     """
     Czy traktujemy to jako 'brak wartości'?
 
     Brak = puste, NaN, '---'.
     """
-    if v is None:
+    if v is None or v is pd.NA:
         return True
-    if isinstance(v, float):
-        try:
-            if math.isnan(v):
-                return True
-        except Exception:
-            pass
-
-    s = str(v).strip()
+    if v != v:  # NaN – szybciej niż isinstance + math.isnan
+        return True
+
+    s = (v if isinstance(v, str) else str(v)).strip()
     return s == "" or s == "---"
 
 
+def _missing_mask(df_sub: pd.DataFrame) -> pd.DataFrame:
+    """Wektorowa wersja _is_missing dla całych kolumn (bez applymap per komórka)."""
+    out = {}
+    for col in df_sub.columns:
+        s = df_sub[col].astype("string").str.strip()
+        out[col] = s.isna() | s.eq("") | s.eq("---")
+    return pd.DataFrame(out, index=df_sub.index)
+
+
 # ---------- MAPA MIAST WOJEWÓDZKICH ----------
 
 # klucze = _place_base(nazwa_miasta), wartości = (Województwo, Powiat, Gmina, Miejscowość)
@@ -194,6 +250,31 @@ def _detect_warsaw_district_from_gmina(gmi_raw: str) -> str | None:
     return base.title()
 
 
+# ---------- Cache znormalizowanych baz na dysku ----------
+
+def _load_normalized_cache(src: Path) -> pd.DataFrame | None:
+    """
+    Zwraca znormalizowaną ramkę z cache parquet obok pliku źródłowego,
+    o ile cache jest świeższy niż źródło. Wymaga pyarrow/fastparquet –
+    bez nich po prostu zwraca None i liczymy od zera.
+    """
+    cache = src.with_suffix(".normalized.parquet")
+    try:
+        if cache.exists() and cache.stat().st_mtime >= src.stat().st_mtime:
+            return pd.read_parquet(cache)
+    except Exception:
+        pass
+    return None
+
+
+def _save_normalized_cache(src: Path, df: pd.DataFrame) -> None:
+    """Zapisuje cache parquet; brak silnika parquet nie jest błędem."""
+    try:
+        df.to_parquet(src.with_suffix(".normalized.parquet"))
+    except Exception:
+        pass
+
+
 # ---------- Wczytanie i przygotowanie TERYT ----------
 
 def load_teryt(teryt_path: str = "teryt.csv") -> pd.DataFrame:
@@ -205,6 +286,10 @@ def load_teryt(teryt_path: str = "teryt.csv") -> pd.DataFrame:
     if not p.exists():
         raise FileNotFoundError(f"Nie znaleziono pliku TERYT: {p}")
 
+    cached = _load_normalized_cache(p)
+    if cached is not None:
+        return cached
+
     df = pd.read_csv(p, sep=";", dtype=str).fillna("")
 
     required = ["Wojewodztwo", "Powiat", "Gmina", "Miejscowosc", "Dzielnica"]
@@ -212,16 +297,17 @@ def load_teryt(teryt_path: str = "teryt.csv") -> pd.DataFrame:
         if col not in df.columns:
             raise ValueError(f"Brak kolumny '{col}' w pliku TERYT")
 
-    df["woj_n"] = df["Wojewodztwo"].map(_norm)
-    df["pow_n"] = df["Powiat"].map(_norm)
-    df["gmi_n"] = df["Gmina"].map(_norm)
-    df["miej_n"] = df["Miejscowosc"].map(_norm)
-    df["dz_n"] = df["Dzielnica"].map(_norm)
+    df["woj_n"] = _norm_series(df["Wojewodztwo"])
+    df["pow_n"] = _norm_series(df["Powiat"])
+    df["gmi_n"] = _norm_series(df["Gmina"])
+    df["miej_n"] = _norm_series(df["Miejscowosc"])
+    df["dz_n"] = _norm_series(df["Dzielnica"])
 
     # klucze "bazowe" (bez Kolonia/Osiedle/Nowa/Stara) dla miejscowości/gminy
     df["miej_base"] = df["Miejscowosc"].map(_place_base)
     df["gmi_base"] = df["Gmina"].map(_place_base)
 
+    _save_normalized_cache(p, df)
     return df
 
 
@@ -243,190 +329,175 @@ def load_obszar_sadow(path: str = "obszar_sadow.xlsx") -> pd.DataFrame:
             "miej_base", "gmi_base"
         ])
 
-    df = pd.read_excel(p, sheet_name=0, dtype=str).fillna("")
+    cached = _load_normalized_cache(p)
+    if cached is not None:
+        return cached
+
+    df = _read_excel(p, sheet_name=0, dtype=str).fillna("")
 
     required = ["Województwo", "Powiat", "Gmina", "Miejscowość", "Dzielnica"]
     for col in required:
         if col not in df.columns:
             raise ValueError(f"Brak kolumny '{col}' w pliku obszar_sadow.xlsx")
 
-    df["woj_n"] = df["Województwo"].map(_norm)
-    df["pow_n"] = df["Powiat"].map(_norm)
-    df["gmi_n"] = df["Gmina"].map(_norm)
-    df["miej_n"] = df["Miejscowość"].map(_norm)
-    df["dz_n"] = df["Dzielnica"].map(_norm)
+    df["woj_n"] = _norm_series(df["Województwo"])
+    df["pow_n"] = _norm_series(df["Powiat"])
+    df["gmi_n"] = _norm_series(df["Gmina"])
+    df["miej_n"] = _norm_series(df["Miejscowość"])
+    df["dz_n"] = _norm_series(df["Dzielnica"])
 
     df["miej_base"] = df["Miejscowość"].map(_place_base)
     df["gmi_base"] = df["Gmina"].map(_place_base)
 
+    _save_normalized_cache(p, df)
     return df
 
 
-# ---------- Uzupełnianie na podstawie jednej bazy (TERYT / obszar_sadow) ----------
+# ---------- Uzupełnianie na podstawie baz (TERYT / obszar_sadow) – hash-joiny ----------
+
+# poziomy kluczy dopasowania – od najbardziej szczegółowego do najgrubszego;
+# warianty *_base łapią dopiski typu "Kolonia"/"Osiedle"/"Nowa"/"Stara"
+KEY_LEVELS = [
+    ["woj_n", "pow_n", "gmi_n", "miej_n", "dz_n"],
+    ["woj_n", "pow_n", "gmi_n", "miej_n"],
+    ["woj_n", "pow_n", "gmi_n", "miej_base"],
+    ["woj_n", "pow_n", "gmi_n"],
+    ["woj_n", "pow_n", "gmi_base"],
+    ["woj_n", "pow_n", "miej_n"],
+    ["woj_n", "pow_n"],
+    # gmina bez powiatu – np. raport ma Województwo+Gminę, a Powiat pusty;
+    # bez tych poziomów takie wiersze nie łapały żadnego klucza z gminą
+    ["woj_n", "gmi_n"],
+    ["woj_n", "gmi_base"],
+    ["woj_n", "miej_n"],
+    ["woj_n", "miej_base"],
+    ["miej_n"],
+    ["miej_base"],
+]
+
+# klucze pomocnicze dodawane do raportu na czas dopasowań
+_HELPER_COLS = ["woj_n", "pow_n", "gmi_n", "miej_n", "dz_n", "miej_base", "gmi_base"]
+
 
-def _fill_from_source(
-    r: pd.Series,
-    df: pd.DataFrame,
-    woj_n: str,
-    pow_n: str,
-    gmi_n: str,
-    mj_n: str,
-    dz_n: str,
-) -> pd.Series:
+def _build_lookups(df: pd.DataFrame, col_map: dict[str, str]) -> list[tuple[list[str], pd.DataFrame]]:
     """
-    Uzupełnia braki w wierszu `r` na podstawie jednego źródła (TERYT albo obszar_sadow).
-    Wprowadzone heurystyki:
-    - używamy też kluczy bazowych miejscowości/gminy (bez Kolonia/Osiedle/Nowa/Stara),
-    - jeśli jest Gmina, ale brak Miejscowości → próbujemy podstawić miejscowość
-      "domyślną" (najczęstsza dla danej gminy),
-    - nadal uzupełniamy tylko pola, które są puste lub '---'.
+    Buduje tabele dopasowań dla kolejnych poziomów kluczy z KEY_LEVELS.
+    `col_map` mapuje kolumny źródła (TERYT / obszar_sadow) na kolumny raportu.
+    Każda tabela ma dla danego klucza dokładnie jedną (jednoznaczną) wartość
+    adresową albo NA – dzięki temu uzupełnianie to zwykłe merge po kluczu,
+    a nie filtrowanie całej bazy dla każdego wiersza raportu.
     """
+    lookups: list[tuple[list[str], pd.DataFrame]] = []
     if df.empty:
-        return r
-
-    subset = df.copy()
-
-    # 1) Województwo
-    if woj_n:
-        subset = subset[subset["woj_n"] == woj_n]
-
-    # 2) Powiat
-    if pow_n and not subset.empty:
-        sub = subset[subset["pow_n"] == pow_n]
-        if not sub.empty:
-            subset = sub
-
-    # Klucze bazowe z wiersza (dla dopisków typu "Kolonia", "Nowa", "Stara")
-    mj_base = _place_base(r.get("Miejscowość", "")) if not _is_missing(r.get("Miejscowość", "")) else ""
-    gmi_base_row = _place_base(r.get("Gmina", "")) if not _is_missing(r.get("Gmina", "")) else ""
-
-    # 3) Dzielnica (jeśli jest)
-    if dz_n and not subset.empty:
-        sub = subset[subset["dz_n"] == dz_n]
-        if not sub.empty:
-            subset = sub
-
-    # 4) Miejscowość: najpierw normalna, potem bazowa (bez Kolonia/Osiedle/Nowa/Stara)
-    if (mj_n or mj_base) and not subset.empty:
-        sub = subset
-        if mj_n:
-            sub = sub[sub["miej_n"] == mj_n]
-        if sub.empty and mj_base and "miej_base" in subset.columns:
-            sub = subset[subset["miej_base"] == mj_base]
-        if not sub.empty:
-            subset = sub
-
-    # 5) Gmina: normalna + bazowa
-    if (gmi_n or gmi_base_row) and not subset.empty:
-        sub = subset
-        if gmi_n:
-            sub = sub[sub["gmi_n"] == gmi_n]
-        if sub.empty and gmi_base_row and "gmi_base" in subset.columns:
-            sub = subset[subset["gmi_base"] == gmi_base_row]
-        if not sub.empty:
-            subset = sub
-
-    if subset.empty:
-        return r
-
-    # 5a) SPECJALNIE: jeśli mamy Gminę, ale brak Miejscowości → spróbuj ustalić "stolicę gminy"
-    if _is_missing(r.get("Miejscowość", "")) and not _is_missing(r.get("Gmina", "")):
-        if "Miejscowość" in subset.columns:
-            mcol = "Miejscowość"
-        else:
-            mcol = "Miejscowosc"
-        if mcol in subset.columns and not subset.empty:
-            mode_vals = subset[mcol].mode()
-            if not mode_vals.empty:
-                r["Miejscowość"] = mode_vals.iloc[0]
-
-    # 6) Uzupełniamy tylko brakujące pola (puste lub '---'),
-    #    ale TYLKO jeżeli w źródle jest dokładnie jedna wartość.
-    for col in ADDR_COLS:
-        cur = r.get(col, "")
-        if _is_missing(cur):
-            if col == "Województwo":
-                t_col = "Województwo" if "Województwo" in subset.columns else "Wojewodztwo"
-            elif col == "Miejscowość":
-                t_col = "Miejscowość" if "Miejscowość" in subset.columns else "Miejscowosc"
-            else:
-                t_col = col
-
-            if t_col not in subset.columns:
-                continue
-
-            vals = subset[t_col].dropna().unique()
-            if len(vals) == 1 and vals[0]:
-                r[col] = vals[0]
-
-    return r
-
+        return lookups
+
+    src = df.rename(columns=col_map)
+    # puste wartości nie mogą "wygrywać" w grupie → traktujemy je jak NA
+    vals = src[ADDR_COLS].mask(src[ADDR_COLS].eq(""))
+    src = pd.concat([src[[c for c in src.columns if c not in ADDR_COLS]], vals], axis=1)
+
+    for keys in KEY_LEVELS:
+        g = src.groupby(keys)[ADDR_COLS]
+        # jednoznaczna wartość w grupie albo NA (agregacje nunique/first są wektorowe)
+        grp = g.first().where(g.nunique() == 1)
+        # klucze bez żadnej jednoznacznej wartości nic nie wniosą – nie ciągniemy
+        # ich przez merge (mniejsze tabele hashowe, mniej kolumn na wiersz)
+        grp = grp.dropna(how="all")
+        fill_cols = [c for c in ADDR_COLS if grp[c].notna().any()]
+        if not fill_cols:
+            continue
+        lookups.append((keys, grp[fill_cols].reset_index()))
+    return lookups
+
+
+def _merge_fill(df: pd.DataFrame, lookups: list[tuple[list[str], pd.DataFrame]]) -> pd.DataFrame:
+    """
+    Uzupełnia braki adresowe serią left-merge'ów po coraz grubszych kluczach.
+    Wypełnia tylko pola puste. Poziomy bez `woj_n` stosujemy wyłącznie tam,
+    gdzie województwo jest nieznane – inaczej unikalna w skali kraju nazwa
+    miejscowości mogłaby nadpisać adres z innego województwa.
+    """
+    for keys, lookup in lookups:
+        df = df.merge(lookup, on=keys, how="left", suffixes=("", "_fill"))
+        fill_cols = [c + "_fill" for c in ADDR_COLS if c + "_fill" in df.columns]
+        for fill_col in fill_cols:
+            col = fill_col[: -len("_fill")]
+            need = df[col].eq("") & df[fill_col].notna()
+            if "woj_n" not in keys:
+                need &= df["woj_n"].eq("")
+            if need.any():
+                df.loc[need, col] = df.loc[need, fill_col]
+        # jedno zrzucenie kolumn pomocniczych na poziom (zamiast kopii per kolumna)
+        df = df.drop(columns=fill_cols)
+    return df
 
-# ---------- Uzupełnianie jednego wiersza – specjalne reguły + TERYT + obszar_sadow ----------
 
-def _enrich_row(row: pd.Series, teryt: pd.DataFrame, sad: pd.DataFrame) -> pd.Series:
+def _fill_gmina_default_place(df: pd.DataFrame, teryt: pd.DataFrame) -> pd.DataFrame:
     """
-    Uzupełnia dziury adresowe w jednym wierszu na podstawie:
-    1) specjalnych reguł Warszawy (dawne gminy 1999–2002)
-    2) miast wojewódzkich (Warszawa → Mazowieckie/Warszawa/...)
-    3) TERYT
-    4) obszar_sadow.xlsx (jako dodatkowe źródło)
-
-    Brak = puste albo '---'.
+    Jeśli jest Gmina, ale brak Miejscowości → podstaw miejscowość "domyślną"
+    (najczęstszą w TERYT dla danej gminy).
     """
-    r = row.copy()
-
-    # --- 1) Specjalne: dawne gminy Warszawy (np. 'Warszawa-Ursus') ---
-    gmi_raw_initial = r.get("Gmina", "")
-    dz_wawa = _detect_warsaw_district_from_gmina(gmi_raw_initial)
-    if dz_wawa:
-        # Ustaw Mazowieckie / Warszawa / Warszawa / Warszawa / <dzielnica>
-        if _is_missing(r.get("Województwo", "")):
-            r["Województwo"] = "Mazowieckie"
-        if _is_missing(r.get("Powiat", "")):
-            r["Powiat"] = "Warszawa"
-        # Gmina zawsze 'Warszawa'
-        r["Gmina"] = "Warszawa"
-        if _is_missing(r.get("Miejscowość", "")):
-            r["Miejscowość"] = "Warszawa"
-        if _is_missing(r.get("Dzielnica", "")):
-            r["Dzielnica"] = dz_wawa
-
-    # --- 2) Miasta wojewódzkie (po ewentualnej korekcie gminy Warszawy) ---
-    mj_raw_initial = r.get("Miejscowość", "")
-    capital_key = _place_base(mj_raw_initial)
-    if capital_key in CAPITAL_MAP:
-        woj_cap, pow_cap, gmi_cap, mj_cap = CAPITAL_MAP[capital_key]
-        if _is_missing(r.get("Województwo", "")):
-            r["Województwo"] = woj_cap
-        if _is_missing(r.get("Powiat", "")):
-            r["Powiat"] = pow_cap
-        if _is_missing(r.get("Gmina", "")):
-            r["Gmina"] = gmi_cap
-        if _is_missing(r.get("Miejscowość", "")):
-            r["Miejscowość"] = mj_cap
-
-    # --- 3) Normalizacja po powyższych krokach ---
-    woj_raw = r.get("Województwo", "")
-    pow_raw = r.get("Powiat", "")
-    gmi_raw = r.get("Gmina", "")
-    mj_raw  = r.get("Miejscowość", "")
-    dz_raw  = r.get("Dzielnica", "")
-
-    woj_n = _norm(woj_raw) if not _is_missing(woj_raw) else ""
-    pow_n = _norm(pow_raw) if not _is_missing(pow_raw) else ""
-    gmi_n = _norm(gmi_raw) if not _is_missing(gmi_raw) else ""
-    mj_n  = _norm(mj_raw)  if not _is_missing(mj_raw)  else ""
-    dz_n  = _norm(dz_raw)  if not _is_missing(dz_raw)  else ""
-
-    # --- 4) TERYT ---
-    r = _fill_from_source(r, teryt, woj_n, pow_n, gmi_n, mj_n, dz_n)
-
-    # --- 5) obszar_sadow, jeśli dalej są braki ---
-    if not sad.empty and any(_is_missing(r.get(col, "")) for col in ADDR_COLS):
-        r = _fill_from_source(r, sad, woj_n, pow_n, gmi_n, mj_n, dz_n)
-
-    return r
+    if teryt.empty:
+        return df
+
+    need = df["Miejscowość"].eq("") & ~df["Gmina"].eq("")
+    if not need.any():
+        return df
+
+    # klucze mogły się zdezaktualizować po uzupełnieniach – przelicz gminę/województwo
+    df["woj_n"] = _norm_series(df["Województwo"])
+    df["gmi_n"] = _norm_series(df["Gmina"])
+
+    # najczęstsza miejscowość gminy – value_counts sortuje malejąco w grupie,
+    # więc pierwszy wiersz grupy to "stolica" gminy (bez lambdy per grupa)
+    defaults = (
+        teryt.loc[teryt["Miejscowosc"] != "", ["woj_n", "gmi_n", "Miejscowosc"]]
+        .groupby(["woj_n", "gmi_n"])["Miejscowosc"]
+        .value_counts()
+        .groupby(level=["woj_n", "gmi_n"])
+        .head(1)
+        .reset_index()[["woj_n", "gmi_n", "Miejscowosc"]]
+        .rename(columns={"Miejscowosc": "_miej_default"})
+    )
+    df = df.merge(defaults, on=["woj_n", "gmi_n"], how="left")
+    need = df["Miejscowość"].eq("") & ~df["Gmina"].eq("") & df["_miej_default"].notna()
+    df.loc[need, "Miejscowość"] = df.loc[need, "_miej_default"]
+    return df.drop(columns="_miej_default")
+
+
+# ---------- Specjalne reguły – dawne gminy Warszawy + miasta wojewódzkie ----------
+
+def _apply_warsaw_rules(df: pd.DataFrame) -> None:
+    """Dawne gminy Warszawy (np. 'Warszawa-Ursus') → Mazowieckie/Warszawa/.../dzielnica."""
+    # szybki prefiltr po całej kolumnie – detektor uruchamiamy tylko tam,
+    # gdzie gmina w ogóle zawiera 'warszawa'
+    gmina = df["Gmina"].astype(str)
+    cand = gmina.str.contains("warszawa", case=False, regex=False)
+    if not cand.any():
+        return
+    dz = pd.Series(pd.NA, index=df.index, dtype=object)
+    dz[cand] = gmina[cand].map(_detect_warsaw_district_from_gmina)
+    m = dz.notna()
+    if not m.any():
+        return
+    df.loc[m & df["Województwo"].eq(""), "Województwo"] = "Mazowieckie"
+    df.loc[m & df["Powiat"].eq(""), "Powiat"] = "Warszawa"
+    # Gmina zawsze 'Warszawa'
+    df.loc[m, "Gmina"] = "Warszawa"
+    df.loc[m & df["Miejscowość"].eq(""), "Miejscowość"] = "Warszawa"
+    need_dz = m & df["Dzielnica"].eq("")
+    df.loc[need_dz, "Dzielnica"] = dz[need_dz]
+
+
+def _apply_capital_map(df: pd.DataFrame) -> None:
+    """Miasta wojewódzkie: sama miejscowość wystarcza do uzupełnienia reszty adresu."""
+    cap = df["Miejscowość"].map(_place_base).map(CAPITAL_MAP)
+    m = cap.notna()
+    if not m.any():
+        return
+    for i, col in enumerate(("Województwo", "Powiat", "Gmina", "Miejscowość")):
+        need = m & df[col].eq("")
+        df.loc[need, col] = cap[need].str[i]
 
 
 # ---------- Przetwarzanie całego pliku ----------
@@ -439,25 +510,44 @@ def clean_report(path: Path, teryt_path: str = "teryt.csv", sad_path: str = "obs
         raise FileNotFoundError(f"Plik raportu nie istnieje: {path}")
 
     # wczytaj raport
-    df = pd.read_excel(path).fillna("")
+    df = _read_excel(path).fillna("")
 
     # upewnij się, że kolumny adresowe istnieją
     for col in ADDR_COLS:
         if col not in df.columns:
             df[col] = ""
 
-    # Zamień wszystkie '---' w kolumnach adresowych na puste stringi
+    # Zamień wszystkie '---'/NaN w kolumnach adresowych na puste stringi –
+    # jedno wektorowe przejście po kolumnie zamiast apply per komórka
+    miss = _missing_mask(df[ADDR_COLS])
     for col in ADDR_COLS:
-        if col in df.columns:
-            df[col] = df[col].apply(
-                lambda v: "" if _is_missing(v) else v
-            )
+        df[col] = df[col].astype("string").fillna("").mask(miss[col], "")
 
     # statystyka przed (brak = puste lub '---')
-    missing_before = (df[ADDR_COLS].applymap(_is_missing)).sum()
+    missing_before = _missing_mask(df[ADDR_COLS]).sum()
+
+    # --- 1-2) specjalne reguły: dawne gminy Warszawy + miasta wojewódzkie ---
+    _apply_warsaw_rules(df)
+    _apply_capital_map(df)
+
+    # --- 3) znormalizowane klucze dopasowania – raz, dla całej ramki ---
+    df["woj_n"] = _norm_series(df["Województwo"])
+    df["pow_n"] = _norm_series(df["Powiat"])
+    df["gmi_n"] = _norm_series(df["Gmina"])
+    df["miej_n"] = _norm_series(df["Miejscowość"])
+    df["dz_n"] = _norm_series(df["Dzielnica"])
+    df["miej_base"] = df["Miejscowość"].map(_place_base)
+    df["gmi_base"] = df["Gmina"].map(_place_base)
+
+    # --- 4) TERYT, potem 5) obszar_sadow – merge po kluczach zamiast pętli po wierszach ---
+    teryt_map = {"Wojewodztwo": "Województwo", "Miejscowosc": "Miejscowość"}
+    df2 = _merge_fill(df, _build_lookups(teryt, teryt_map))
+    df2 = _merge_fill(df2, _build_lookups(sad, {}))
+
+    # jeśli jest Gmina, a brak Miejscowości → miejscowość "domyślna" gminy
+    df2 = _fill_gmina_default_place(df2, teryt)
 
-    # uzupełnianie (Warszawa-gminy + miasta wojewódzkie + TERYT + obszar_sadow)
-    df2 = df.apply(_enrich_row, axis=1, teryt=teryt, sad=sad)
+    df2 = df2.drop(columns=_HELPER_COLS)
 
     # --- jeśli po uzupełnianiu nadal są braki w KLUCZOWYCH częściach adresu
     #     (Województwo, Powiat, Gmina, Miejscowość),
@@ -469,7 +559,7 @@ def clean_report(path: Path, teryt_path: str = "teryt.csv", sad_path: str = "obs
             df2[vcol] = ""
 
     CORE_ADDR_COLS = ["Województwo", "Powiat", "Gmina", "Miejscowość"]
-    unresolved_mask = df2[CORE_ADDR_COLS].applymap(_is_missing).any(axis=1)
+    unresolved_mask = _missing_mask(df2[CORE_ADDR_COLS]).any(axis=1)
     df2.loc[unresolved_mask, VALUE_COLS] = "Proszę dopisz manualnie"
 
     # wszystko na WIELKIE LITERY dla adresu
@@ -478,7 +568,7 @@ def clean_report(path: Path, teryt_path: str = "teryt.csv", sad_path: str = "obs
             df2[col] = df2[col].astype(str).str.upper()
 
     # statystyka po
-    missing_after = (df2[ADDR_COLS].applymap(_is_missing)).sum()
+    missing_after = _missing_mask(df2[ADDR_COLS]).sum()
 
     # zapis NADPISUJĄCY ten sam plik
     df2.to_excel(path, index=False)
@@ -7,10 +7,26 @@ adres_otodom.py — wyciąganie woj/pow/gm/miasto/dzielnica/ulica z ogłoszeń O
 """
 
 from __future__ import annotations
+import functools
 import re
 from typing import Dict, Optional
 from bs4 import BeautifulSoup
 
+# lxml parsuje w C i jest wyraźnie szybszy od czystopythonowego html.parser;
+# gdy go nie ma, zostajemy przy wbudowanym
+try:
+    from lxml import html as lxhtml
+    _BS_PARSER = "lxml"
+except ImportError:
+    lxhtml = None
+    _BS_PARSER = "html.parser"
+
+# pyahocorasick: jeden przebieg DFA po kandydacie zamiast ~25 skanów `in`
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Frazy/elementy interfejsu, których NIGDY nie traktujemy jako części ulicy
 _UI_BLACKLIST = {
     # ogólne przyciski/CTA
@@ -24,39 +40,96 @@ _UI_BLACKLIST = {
     "google", "maps", "openstreetmap", "wyznacz trasę", "wyznacz trase", "trasa", "dojazd",
 }
 
+if ahocorasick is not None:
+    _UI_BLACKLIST_AC = ahocorasick.Automaton()
+    for _w in _UI_BLACKLIST:
+        _UI_BLACKLIST_AC.add_word(_w, _w)
+    _UI_BLACKLIST_AC.make_automaton()
+else:
+    _UI_BLACKLIST_AC = None
+
+# fallback bez pyahocorasick: jedna alternatywa literałów skanowana w C przez
+# SRE zamiast pętli str.__contains__ w Pythonie
+_UI_BLACKLIST_RE = re.compile("|".join(re.escape(w) for w in sorted(_UI_BLACKLIST)))
+
+# jednowyrazowe wpisy jako frozenset – hash-lookup łapie typowy brudny
+# kandydat ("Wróć", "Galeria"...) zanim ruszy jakikolwiek skan
+_UI_BL_TOKENS = frozenset(w for w in _UI_BLACKLIST if " " not in w)
+
+
+def _hits_ui_blacklist(tl: str) -> bool:
+    # pełnego skanu nie da się pominąć przy czystych tokenach — wpisy typu
+    # "otomoto.pl" czy "google" mają łapać też podciągi (np. w URL-ach)
+    if _UI_BL_TOKENS.intersection(tl.split()):
+        return True
+    if _UI_BLACKLIST_AC is not None:
+        for _ in _UI_BLACKLIST_AC.iter(tl):
+            return True
+        return False
+    return _UI_BLACKLIST_RE.search(tl) is not None
+
+
 # Prefiksy/typy dróg dopuszczalne na początku nazwy
 _STREET_PREFIX = r"(ul\.|ulica|al\.|aleja|alei|aleje|pl\.|plac|os\.|osiedle|rynek|rondo|bulw\.|bulwar|skwer)"
 
+# wszystkie wzorce kompilowane raz przy imporcie – re.search/re.sub z literałem
+# w gorącej pętli płaci za lookup w wewnętrznym cache re przy każdym wywołaniu
+_RE_WS            = re.compile(r"\s+")
+_RE_TAIL_SEP      = re.compile(r"[|•·—–]\s*.*$")
+_RE_TLD           = re.compile(r"(https?://|www\.)|\b[a-z0-9.-]+\.(pl|com|net|org)\b", re.I)
+_RE_DBL_DOT       = re.compile(r"\b(ul|al|pl)\.\s*\.\s*", re.I)
+_RE_UL_LICA       = re.compile(r"\bul\.\s*lica\b", re.I)
+_RE_AL_EJA        = re.compile(r"\bal\.\s*eja\b", re.I)
+_RE_PL_AC         = re.compile(r"\bpl\.\s*ac\b", re.I)
+_RE_MULTI_SPACE   = re.compile(r"\s{2,}")
+_RE_STREET_PREFIX = re.compile(rf"^{_STREET_PREFIX}\b", re.I)
+# niezakotwiczony wariant do taniego testu na surowym HTML-u
+_RE_STREET_HINT   = re.compile(_STREET_PREFIX, re.I)
+_RE_UPPER_START   = re.compile(r"^[A-ZĄĆĘŁŃÓŚŻŹ]")
+_RE_MAP_LABEL     = re.compile(r"^pokaż na mapie\s*|^pokaz na mapie\s*", re.I)
+
+# wszystkie pola JSON w jednym wzorcu – jeden przebieg po HTML-u zamiast
+# dwunastu osobnych skanów; priorytet kluczy rozstrzygamy po zebraniu trafień
+_JSON_FIELD_RE = re.compile(
+    r'"(streetLabel|streetName|street|route|cityLabel|city|locality|'
+    r'districtLabel|district|subLocality|province|voivodeship)"\s*:\s*"([^"]+)"',
+    re.I | re.S,
+)
+_JSON_STREET_KEYS   = ("streetlabel", "streetname", "street", "route")
+_JSON_CITY_KEYS     = ("citylabel", "city", "locality")
+_JSON_DISTRICT_KEYS = ("districtlabel", "district", "sublocality")
+_JSON_PROVINCE_KEYS = ("province", "voivodeship")
+
 # ------------------------------ utils ----------------------------------------
 
 
 def _clean(text: Optional[str]) -> str:
     if not text:
         return ""
-    t = re.sub(r"\s+", " ", str(text)).strip()
+    t = _RE_WS.sub(" ", str(text)).strip()
     # odetnij „dopiski” po separatorach widocznych w nagłówkach
-    t = re.sub(r"[|•·—–]\s*.*$", "", t)
+    t = _RE_TAIL_SEP.sub("", t)
     return t
 
 
 def _has_tld(s: str) -> bool:
     """Czy zawiera coś co wygląda na domenę (np. otomoto.pl) albo URL."""
-    return bool(re.search(r"(https?://|www\.)|\b[a-z0-9.-]+\.(pl|com|net|org)\b", s, re.I))
+    return bool(_RE_TLD.search(s))
 
 
 def _normalize_street(s: str) -> str:
     """Napraw typowe zlepki z DOM-u: 'ul. .' / 'al. eja' / 'pl. ac' itp."""
     t = s
     # podwójne kropki po prefiksach
-    t = re.sub(r"(?i)\b(ul|al|pl)\.\s*\.\s*", r"\1. ", t)
+    t = _RE_DBL_DOT.sub(r"\1. ", t)
     # 'ul. ica' -> 'ul.'
-    t = re.sub(r"(?i)\bul\.\s*lica\b", "ul.", t)
+    t = _RE_UL_LICA.sub("ul.", t)
     # 'al. eja' -> 'al.'
-    t = re.sub(r"(?i)\bal\.\s*eja\b", "al.", t)
+    t = _RE_AL_EJA.sub("al.", t)
     # 'pl. ac' -> 'pl.'
-    t = re.sub(r"(?i)\bpl\.\s*ac\b", "pl.", t)
+    t = _RE_PL_AC.sub("pl.", t)
     # zbędne spacje/kropki
-    t = re.sub(r"\s{2,}", " ", t).strip(" ,.-")
+    t = _RE_MULTI_SPACE.sub(" ", t).strip(" ,.-")
     return t
 
 
@@ -66,15 +139,22 @@ def _looks_like_street(s: str) -> str:
     """
     if not s:
         return ""
-    t = _normalize_street(_clean(s))
+    # tani pre-filtr zanim ruszy normalizacja i regexy: za długie teksty
+    # i kandydaci bez litery na początku i tak nigdy nie przechodzą
+    raw = str(s)
+    if len(raw) > 200:
+        return ""
+    c0 = raw.strip(" ,.-\xa0\t\r\n")[:1]
+    if not c0.isalpha():
+        return ""
+    t = _normalize_street(_clean(raw))
     tl = t.lower()
 
     # odrzuć domieszki interfejsu, domeny itp.
     if _has_tld(tl):
         return ""
-    for bad in _UI_BLACKLIST:
-        if bad in tl:
-            return ""
+    if _hits_ui_blacklist(tl):
+        return ""
 
     # musi mieć sensowną długość
     words = t.split()
@@ -82,57 +162,54 @@ def _looks_like_street(s: str) -> str:
         return ""
 
     # preferuj znany prefiks ulicy
-    if re.match(rf"^{_STREET_PREFIX}\b", t, re.I):
+    if _RE_STREET_PREFIX.match(t):
         return t
 
     # bez prefiksu: wygląda jak nazwa własna (wielka litera) i nie jest zdaniem/tytułem
-    if re.match(r"^[A-ZĄĆĘŁŃÓŚŻŹ]", t) and not t.endswith(("!", "?", ".")):
+    if _RE_UPPER_START.match(t) and not t.endswith(("!", "?", ".")):
         return t
 
     return ""
 
 
-def _first(patterns, text: str) -> Optional[str]:
-    for pat in patterns:
-        m = re.search(pat, text, re.I | re.S)
-        if m:
-            return _clean(m.group(1))
+def _first(found: Dict[str, str], keys) -> Optional[str]:
+    for k in keys:
+        if k in found:
+            return _clean(found[k])
     return None
 
 
-def _from_json_scripts(html: str) -> Dict[str, str]:
-    """Szybkie parsowanie JSON-ów osadzonych na stronie (bez json.loads)."""
+_JSON_OUT_KEYS = ("province", "county", "gmina", "city", "district", "street")
+
+
+@functools.lru_cache(maxsize=256)
+def _json_fields(html: str) -> tuple:
+    """Krotka pól adresowych z JSON-ów; cache łapie retry/ponowne przebiegi
+    po tym samym HTML-u."""
     out = {"province": "", "county": "", "gmina": "", "city": "", "district": "", "street": ""}
 
-    street = _first([
-        r'"streetLabel"\s*:\s*"([^"]+)"',
-        r'"streetName"\s*:\s*"([^"]+)"',
-        r'"street"\s*:\s*"([^"]+)"',
-        r'"route"\s*:\s*"([^"]+)"',
-    ], html)
-
-    city = _first([
-        r'"cityLabel"\s*:\s*"([^"]+)"',
-        r'"city"\s*:\s*"([^"]+)"',
-        r'"locality"\s*:\s*"([^"]+)"',
-    ], html)
-
-    district = _first([
-        r'"districtLabel"\s*:\s*"([^"]+)"',
-        r'"district"\s*:\s*"([^"]+)"',
-        r'"subLocality"\s*:\s*"([^"]+)"',
-    ], html)
-
-    province = _first([
-        r'"province"\s*:\s*"([^"]+)"',
-        r'"voivodeship"\s*:\s*"([^"]+)"',
-    ], html)
+    # pierwsze wystąpienie każdego klucza z jednego przebiegu po dokumencie
+    found: Dict[str, str] = {}
+    for m in _JSON_FIELD_RE.finditer(html):
+        k = m.group(1).lower()
+        if k not in found:
+            found[k] = m.group(2)
+
+    street = _first(found, _JSON_STREET_KEYS)
+    city = _first(found, _JSON_CITY_KEYS)
+    district = _first(found, _JSON_DISTRICT_KEYS)
+    province = _first(found, _JSON_PROVINCE_KEYS)
 
     out["province"] = _clean(province) if province else ""
     out["city"] = _clean(city) if city else ""
     out["district"] = _clean(district) if district else ""
     out["street"] = _looks_like_street(street) if street else ""
-    return out
+    return tuple(out[k] for k in _JSON_OUT_KEYS)
+
+
+def _from_json_scripts(html: str) -> Dict[str, str]:
+    """Szybkie parsowanie JSON-ów osadzonych na stronie (bez json.loads)."""
+    return dict(zip(_JSON_OUT_KEYS, _json_fields(html)))
 
 
 def _from_dom(soup: BeautifulSoup) -> Dict[str, str]:
@@ -140,7 +217,8 @@ def _from_dom(soup: BeautifulSoup) -> Dict[str, str]:
     out = {"province": "", "county": "", "gmina": "", "city": "", "district": "", "street": ""}
 
     # 1) Pasek adresu: "Miasto, Dzielnica, Województwo"
-    head = soup.select_one('[data-cy="adPageHeader-address"]')
+    # find z dict-em atrybutów omija kompilator selektorów CSS
+    head = soup.find(attrs={"data-cy": "adPageHeader-address"})
     if head:
         addr = _clean(head.get_text(" ", strip=True))
         parts = [p.strip() for p in addr.split(",") if p.strip()]
@@ -152,11 +230,14 @@ def _from_dom(soup: BeautifulSoup) -> Dict[str, str]:
             out["province"] = parts[-1]
 
     # 2) Link „Pokaż na mapie …”
-    mlink = soup.select_one('[data-cy="adPageMap-link"], a[href*="google.com/maps"], a[href*="maps.google"]')
+    mlink = soup.find(attrs={"data-cy": "adPageMap-link"})
+    if mlink is None:
+        mlink = soup.find(
+            "a", href=lambda h: h and ("google.com/maps" in h or "maps.google" in h)
+        )
     if mlink:
         raw = _clean(mlink.get_text(" ", strip=True))
-        raw = re.sub(r"(?i)^pokaż na mapie\s*", "", raw)
-        raw = re.sub(r"(?i)^pokaz na mapie\s*", "", raw)
+        raw = _RE_MAP_LABEL.sub("", raw)
         raw = raw.split(",")[0].strip()
         s = _looks_like_street(raw)
         if s:
@@ -164,7 +245,7 @@ def _from_dom(soup: BeautifulSoup) -> Dict[str, str]:
 
     # 3) Inne etykiety z nazwą ulicy — tylko jeśli zaczną się od prefiksu
     if not out["street"]:
-        cand = soup.find(string=re.compile(rf"^{_STREET_PREFIX}\b", re.I))
+        cand = soup.find(string=_RE_STREET_PREFIX)
         if cand:
             s = _looks_like_street(cand)
             if s:
@@ -173,6 +254,50 @@ def _from_dom(soup: BeautifulSoup) -> Dict[str, str]:
     return out
 
 
+def _from_dom_lxml(html: str) -> Dict[str, str]:
+    """Jak _from_dom, ale na drzewie lxml z XPath-ami wykonywanymi w C."""
+    out = {"province": "", "county": "", "gmina": "", "city": "", "district": "", "street": ""}
+    try:
+        root = lxhtml.fromstring(html)
+    except Exception:
+        return out
+
+    # 1) Pasek adresu: "Miasto, Dzielnica, Województwo"
+    head = root.xpath('(//*[@data-cy="adPageHeader-address"])[1]')
+    if head:
+        addr = _clean(" ".join(head[0].itertext()))
+        parts = [p.strip() for p in addr.split(",") if p.strip()]
+        if parts:
+            out["city"] = parts[0]
+        if len(parts) > 1:
+            out["district"] = parts[1]
+        if len(parts) > 2:
+            out["province"] = parts[-1]
+
+    # 2) Link „Pokaż na mapie …”
+    mlink = root.xpath('(//*[@data-cy="adPageMap-link"])[1]') or root.xpath(
+        '(//a[contains(@href,"google.com/maps")] | //a[contains(@href,"maps.google")])[1]'
+    )
+    if mlink:
+        raw = _clean(" ".join(mlink[0].itertext()))
+        raw = _RE_MAP_LABEL.sub("", raw)
+        raw = raw.split(",")[0].strip()
+        s = _looks_like_street(raw)
+        if s:
+            out["street"] = s
+
+    # 3) Inne etykiety z nazwą ulicy — tylko jeśli zaczną się od prefiksu
+    if not out["street"]:
+        for txt in root.itertext():
+            if _RE_STREET_PREFIX.search(txt):
+                s = _looks_like_street(txt)
+                if s:
+                    out["street"] = s
+                break
+
+    return out
+
+
 # ----------------------------- API główne ------------------------------------
 
 
@@ -187,9 +312,30 @@ def parse_address(html: str) -> Dict[str, str]:
     # 1) JSON (szybko, stabilnie)
     js = _from_json_scripts(html)
 
-    # 2) DOM (uzupełnienie)
-    soup = BeautifulSoup(html, "html.parser")
-    dm = _from_dom(soup)
+    # komplet z JSON-a → DOM-u (najdroższa faza) w ogóle nie parsujemy
+    if js["province"] and js["city"] and js["street"]:
+        res["wojewodztwo"] = js["province"]
+        res["miejscowosc"] = js["city"]
+        res["dzielnica"] = js["district"]
+        res["ulica"] = _looks_like_street(js["street"])
+        return res
+
+    # 2) DOM (uzupełnienie) – budowę drzewa poprzedza tani skan surowego
+    #    HTML-u; bez żadnego z markerów _from_dom i tak nic nie znajdzie
+    need_dom = (
+        "adPageHeader-address" in html
+        or "adPageMap-link" in html
+        or "google.com/maps" in html
+        or "maps.google" in html
+        or _RE_STREET_HINT.search(html) is not None
+    )
+    if need_dom:
+        if lxhtml is not None:
+            dm = _from_dom_lxml(html)
+        else:
+            dm = _from_dom(BeautifulSoup(html, _BS_PARSER))
+    else:
+        dm = {"province": "", "county": "", "gmina": "", "city": "", "district": "", "street": ""}
 
     # 3) scalanie — preferuj JSON; DOM tylko jako fill-in
     res["wojewodztwo"] = js["province"] or dm["province"] or ""
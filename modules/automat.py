@@ -4,6 +4,7 @@
 
 from __future__ import annotations
 from pathlib import Path
+import re
 import sys
 import unicodedata
 
@@ -37,21 +38,53 @@ def _trim_after_semicolon(val):
         s = s.split(";", 1)[0].strip()
     return s
 
+# jednostki najpierw (w "m2" siedzi cyfra!), potem wszystko co nie jest liczbą
+_UNIT_RE = re.compile(r"zł/m²|zł/m2|m²|m2|zł")
+_NUM_JUNK_RE = re.compile(r"[^\d.\-]")
+
 def _to_float_maybe(x):
     """Parsuje liczby typu '101,62 m²', '52 m2', '11 999 zł/m²' itd."""
     if pd.isna(x):
         return None
-    s = str(x)
-    for unit in ["m²", "m2", "zł/m²", "zł/m2", "zł"]:
-        s = s.replace(unit, "")
-    s = s.replace(" ", "").replace("\xa0", "").replace(",", ".")
-    s = "".join(ch for ch in s if (ch.isdigit() or ch == "." or ch == "-"))
+    s = _UNIT_RE.sub("", str(x)).replace(",", ".")
+    s = _NUM_JUNK_RE.sub("", s)
     try:
         return float(s) if s else None
     except Exception:
         return None
 
 
+def _to_float_series(s: pd.Series) -> np.ndarray:
+    """Wektorowy odpowiednik _to_float_maybe: cała kolumna w jednym przebiegu C."""
+    txt = (
+        s.astype(str)
+         .str.replace(_UNIT_RE, "", regex=True)
+         .str.replace(",", ".", regex=False)
+         .str.replace(_NUM_JUNK_RE, "", regex=True)
+    )
+    return pd.to_numeric(txt, errors="coerce").to_numpy(np.float64)
+
+
+def _read_excel(path, **kwargs) -> pd.DataFrame:
+    """Czyta xlsx szybkim silnikiem calamine, jeśli jest zainstalowany."""
+    try:
+        return pd.read_excel(path, engine="calamine", **kwargs)
+    except (ImportError, ValueError):
+        return pd.read_excel(path, **kwargs)
+
+
+def _write_excel(df: pd.DataFrame, path) -> None:
+    """Zapisuje xlsx przez xlsxwriter zamiast budować skoroszyt w openpyxl.
+
+    Bez constant_memory: pandas pisze kolumnami, a w tym trybie xlsxwriter
+    po cichu gubi komórki zapisane do już spłukanych wierszy.
+    """
+    try:
+        df.to_excel(path, index=False, engine="xlsxwriter")
+    except (ImportError, ValueError):
+        df.to_excel(path, index=False)
+
+
 VALUE_COLS = [
     "Średnia cena za m2 ( z bazy)",
     "Średnia skorygowana cena za m2",
@@ -80,12 +113,12 @@ def main(argv: list[str]) -> int:
 
     # --- wczytaj raport ---
     if raport_path.suffix.lower() in (".xlsx", ".xls"):
-        df_r = pd.read_excel(raport_path)
+        df_r = _read_excel(raport_path)
     else:
         df_r = pd.read_csv(raport_path, sep=None, engine="python")
 
     # --- wczytaj Polska.xlsx ---
-    df_pl = pd.read_excel(polska_path)
+    df_pl = _read_excel(polska_path)
 
     # kolumny w Polska.xlsx
     col_area_pl = _find_col(df_pl.columns, ["metry", "powierzchnia", "m2", "obszar"])
@@ -135,112 +168,202 @@ def main(argv: list[str]) -> int:
     margin_m2  = 15.0
     margin_pct = 15.0
 
-    # ---- pomoc: maski lokalizacji w Polska.xlsx ----
-    def _eq_mask(col_candidates, value):
-        col = _find_col(df_pl.columns, col_candidates)
-        if col is None or not str(value).strip():
-            return pd.Series(True, index=df_pl.index)
-        s = df_pl[col].astype(str).str.strip().str.lower()
-        v = str(value).strip().lower()
-        return s == v
+    # ---- przygotowanie bazy RAZ (zamiast parsowania całej Polska.xlsx per wiersz) ----
 
-    # --- pętla po wierszach raportu ---
-    for i in range(len(df_r)):
-        row = df_r.iloc[i]
+    # metraż i cena za m² jako float64 – jedna wektorowa konwersja na kolumnę
+    area_arr = _to_float_series(df_pl[col_area_pl])
+    price_arr = _to_float_series(df_pl[col_price_pl])
 
-        area_val = _to_float_maybe(_trim_after_semicolon(row[area_col])) if area_col else None
-        if area_val is None:
-            # brak metrażu – pomijamy wiersz
-            continue
-
-        woj_r = _trim_after_semicolon(row[woj_col]) if woj_col else ""
-        pow_r = _trim_after_semicolon(row[pow_col]) if pow_col else ""
-        gmi_r = _trim_after_semicolon(row[gmi_col]) if gmi_col else ""
-        mia_r = _trim_after_semicolon(row[mia_col]) if mia_col else ""
-        dzl_r = _trim_after_semicolon(row[dzl_col]) if dzl_col else ""
-        uli_r = _trim_after_semicolon(row[uli_col]) if uli_col else ""
+    # kolumny lokalizacji znormalizowane raz (strip + lower) i sfaktoryzowane
+    # do kodów int32 – porównanie kodów to SIMD-owa równość intów zamiast
+    # przebiegu po obiektach str
+    def _loc_arr(col_candidates):
+        col = _find_col(df_pl.columns, col_candidates)
+        if col is None:
+            return None
+        codes, uniques = pd.factorize(df_pl[col].astype(str).str.strip().str.lower())
+        lut = {u: c for c, u in enumerate(uniques)}
+        return codes.astype(np.int32, copy=False), lut
+
+    pl_woj = _loc_arr(["wojewodztwo", "województwo"])
+    pl_pow = _loc_arr(["powiat"])
+    pl_gmi = _loc_arr(["gmina"])
+    pl_mia = _loc_arr(["miejscowosc", "miasto", "miejscowość"])
+    pl_dzl = _loc_arr(["dzielnica", "osiedle"])
+    pl_uli = _loc_arr(["ulica"])
+
+    def _eq_mask(loc, value):
+        v = str(value).strip().lower()
+        if loc is None or not v:
+            # brak kolumny albo wartości = brak filtra
+            return True
+        codes, lut = loc
+        code = lut.get(v)
+        if code is None:
+            # wartość spoza bazy – nic nie pasuje
+            return np.zeros(len(codes), dtype=bool)
+        return codes == code
+
+    # kubełki (województwo, miasto) -> pozycje wierszy w Polska.xlsx,
+    # posortowane po metrażu; okno ±delta wycina potem searchsorted w O(log n)
+    if pl_woj is not None and pl_mia is not None:
+        _positions = pd.Series(np.arange(len(df_pl)))
+        loc_index = {}
+        for key, idx in _positions.groupby([pl_woj[0], pl_mia[0]]).groups.items():
+            pos = idx.to_numpy()
+            pos = pos[np.argsort(area_arr[pos], kind="mergesort")]
+            loc_index[key] = (pos, area_arr[pos])
+    else:
+        loc_index = None
 
+    def _avg_for(area_val, woj_r, pow_r, gmi_r, mia_r, dzl_r, uli_r):
+        """Zwraca (średnia, średnia po obniżce) albo (None, None) przy braku dopasowań."""
         # --- filtr metrażu ---
         delta = abs(margin_m2)
         low, high = max(0.0, area_val - delta), area_val + delta
-        m = df_pl[col_area_pl].map(_to_float_maybe)
-        mask_area = (m >= low) & (m <= high)
+
+        # --- zawężenie do kubełka (województwo, miasto) ---
+        woj_v = str(woj_r).strip().lower()
+        mia_v = str(mia_r).strip().lower()
+        if loc_index is not None and woj_v and mia_v:
+            woj_c = pl_woj[1].get(woj_v)
+            mia_c = pl_mia[1].get(mia_v)
+            bucket = loc_index.get((woj_c, mia_c)) if woj_c is not None and mia_c is not None else None
+            if bucket is None:
+                # takiego miasta nie ma w bazie
+                return None, None
+            pos_sorted, a_sorted = bucket
+            # kubełek posortowany po metrażu: okno ±delta to dwa searchsorted
+            lo_i = np.searchsorted(a_sorted, low, side="left")
+            hi_i = np.searchsorted(a_sorted, high, side="right")
+            idx = pos_sorted[lo_i:hi_i]
+            p_arr = price_arr[idx]
+            l_pow = (pl_pow[0][idx], pl_pow[1]) if pl_pow is not None else None
+            l_gmi = (pl_gmi[0][idx], pl_gmi[1]) if pl_gmi is not None else None
+            l_dzl = (pl_dzl[0][idx], pl_dzl[1]) if pl_dzl is not None else None
+            l_uli = (pl_uli[0][idx], pl_uli[1]) if pl_uli is not None else None
+            # metraż, województwo i miasto załatwione kluczem + oknem
+            mask_base = np.ones(idx.size, dtype=bool)
+        else:
+            p_arr = price_arr
+            l_pow, l_gmi, l_dzl, l_uli = pl_pow, pl_gmi, pl_dzl, pl_uli
+            mask_area = (area_arr >= low) & (area_arr <= high)
+            # wspólna część wszystkich wariantów: metraż + województwo + miasto
+            mask_base = mask_area & _eq_mask(pl_woj, woj_r) & _eq_mask(pl_mia, mia_r)
 
         # pełny filtr
-        mask_full = mask_area.copy()
-        mask_full &= _eq_mask(["wojewodztwo", "województwo"], woj_r)
-        mask_full &= _eq_mask(["powiat"], pow_r)
-        mask_full &= _eq_mask(["gmina"], gmi_r)
-        mask_full &= _eq_mask(["miejscowosc", "miasto", "miejscowość"], mia_r)
+        mask_full = mask_base & _eq_mask(l_pow, pow_r) & _eq_mask(l_gmi, gmi_r)
         if dzl_r:
-            mask_full &= _eq_mask(["dzielnica", "osiedle"], dzl_r)
+            mask_full = mask_full & _eq_mask(l_dzl, dzl_r)
         if uli_r:
-            mask_full &= _eq_mask(["ulica"], uli_r)
+            mask_full = mask_full & _eq_mask(l_uli, uli_r)
 
-        df_sel = df_pl[mask_full].copy()
+        sel = mask_full
 
         # fallback 1: ulica + dzielnica + miasto
-        if df_sel.empty and uli_r:
-            mask_ul = mask_area.copy()
-            mask_ul &= _eq_mask(["wojewodztwo", "województwo"], woj_r)
-            mask_ul &= _eq_mask(["miejscowosc", "miasto", "miejscowość"], mia_r)
+        if not sel.any() and uli_r:
+            mask_ul = mask_base
             if dzl_r:
-                mask_ul &= _eq_mask(["dzielnica", "osiedle"], dzl_r)
-            mask_ul &= _eq_mask(["ulica"], uli_r)
-            df_sel = df_pl[mask_ul].copy()
+                mask_ul = mask_ul & _eq_mask(l_dzl, dzl_r)
+            sel = mask_ul & _eq_mask(l_uli, uli_r)
 
         # fallback 2: dzielnica + miasto
-        if df_sel.empty and dzl_r:
-            mask_dziel = mask_area.copy()
-            mask_dziel &= _eq_mask(["wojewodztwo", "województwo"], woj_r)
-            mask_dziel &= _eq_mask(["miejscowosc", "miasto", "miejscowość"], mia_r)
-            mask_dziel &= _eq_mask(["dzielnica", "osiedle"], dzl_r)
-            df_sel = df_pl[mask_dziel].copy()
+        if not sel.any() and dzl_r:
+            sel = mask_base & _eq_mask(l_dzl, dzl_r)
 
         # fallback 3: samo miasto
-        if df_sel.empty and mia_r:
-            mask_miasto = mask_area.copy()
-            mask_miasto &= _eq_mask(["wojewodztwo", "województwo"], woj_r)
-            mask_miasto &= _eq_mask(["miejscowosc", "miasto", "miejscowość"], mia_r)
-            df_sel = df_pl[mask_miasto].copy()
+        if not sel.any() and mia_r:
+            sel = mask_base
 
-        if df_sel.empty:
+        if not sel.any():
             # brak dopasowań – zostawiamy puste pola
-            continue
+            return None, None
 
-        prices = df_sel[col_price_pl].map(_to_float_maybe)
-        df_sel = df_sel[prices.notna()].copy()
-        prices = df_sel[col_price_pl].map(_to_float_maybe)
+        prices = p_arr[sel]
+        prices = prices[~np.isnan(prices)]
 
-        if len(prices) >= 4:
-            q1 = np.nanpercentile(prices, 25)
-            q3 = np.nanpercentile(prices, 75)
+        if prices.size >= 4:
+            # jedno sortowanie obsługuje kwantyle, przycięcie IQR i średnią;
+            # np.percentile sortowałoby od nowa, a maska skanowała całość
+            prices.sort()
+            n1 = prices.size - 1
+
+            def _q(p):
+                pos = n1 * p
+                base = int(pos)
+                frac = pos - base
+                nxt = base + 1 if base < n1 else base
+                return prices[base] + (prices[nxt] - prices[base]) * frac
+
+            q1, q3 = _q(0.25), _q(0.75)
             iqr = q3 - q1
             lo = q1 - 1.5 * iqr
             hi = q3 + 1.5 * iqr
-            df_sel = df_sel[(prices >= lo) & (prices <= hi)].copy()
-            prices = df_sel[col_price_pl].map(_to_float_maybe)
+            prices = prices[np.searchsorted(prices, lo, side="left"):
+                            np.searchsorted(prices, hi, side="right")]
 
-        if df_sel.empty:
-            continue
+        if prices.size == 0:
+            return None, None
 
-        avg = float(np.nanmean(prices)) if not df_sel.empty else None
+        avg = float(np.mean(prices))
+        corrected = avg * (1 - margin_pct / 100.0) if margin_pct > 0 else avg
+        return avg, corrected
 
-        if avg is not None and margin_pct > 0:
-            corrected = avg * (1 - margin_pct / 100.0)
-        else:
-            corrected = avg
+    # ten sam adres + metraż (wiele mieszkań w jednym budynku) liczy się
+    # identycznie – wynik trzymamy w cache'u zamiast liczyć od nowa
+    result_cache: dict[tuple, tuple] = {}
+
+    # bufory wynikowe – zapis per komórka przez df.at kosztuje trzy
+    # wyszukiwania indeksu na wiersz, więc zbieramy do tablic i
+    # przypisujemy kolumny raz po pętli
+    out_avg  = df_r[col_avg].to_numpy(dtype=object, copy=True)
+    out_corr = df_r[col_avg_corr].to_numpy(dtype=object, copy=True)
+    out_stat = df_r[col_stat].to_numpy(dtype=object, copy=True)
+
+    # pozycje kolumn raz – itertuples czyta krotki bez budowania Series per wiersz
+    def _pos(col):
+        return df_r.columns.get_loc(col) if col is not None else None
+
+    area_pos = _pos(area_col)
+    woj_pos, pow_pos, gmi_pos = _pos(woj_col), _pos(pow_col), _pos(gmi_col)
+    mia_pos, dzl_pos, uli_pos = _pos(mia_col), _pos(dzl_col), _pos(uli_col)
+
+    # --- pętla po wierszach raportu ---
+    for i, row in enumerate(df_r.itertuples(index=False, name=None)):
+        area_val = _to_float_maybe(_trim_after_semicolon(row[area_pos])) if area_pos is not None else None
+        if area_val is None:
+            # brak metrażu – pomijamy wiersz
+            continue
+
+        woj_r = _trim_after_semicolon(row[woj_pos]) if woj_pos is not None else ""
+        pow_r = _trim_after_semicolon(row[pow_pos]) if pow_pos is not None else ""
+        gmi_r = _trim_after_semicolon(row[gmi_pos]) if gmi_pos is not None else ""
+        mia_r = _trim_after_semicolon(row[mia_pos]) if mia_pos is not None else ""
+        dzl_r = _trim_after_semicolon(row[dzl_pos]) if dzl_pos is not None else ""
+        uli_r = _trim_after_semicolon(row[uli_pos]) if uli_pos is not None else ""
+
+        key = (woj_r, pow_r, gmi_r, mia_r, dzl_r, uli_r, round(area_val, 2))
+        hit = result_cache.get(key)
+        if hit is None:
+            hit = _avg_for(area_val, woj_r, pow_r, gmi_r, mia_r, dzl_r, uli_r)
+            result_cache[key] = hit
+        avg, corrected = hit
+
+        if avg is None:
+            continue
 
-        stat_val = (area_val * corrected) if (area_val is not None and corrected is not None) else ""
+        out_avg[i]  = avg
+        out_corr[i] = corrected
+        out_stat[i] = area_val * corrected
 
-        df_r.at[i, col_avg]       = avg if avg is not None else ""
-        df_r.at[i, col_avg_corr]  = corrected if corrected is not None else ""
-        df_r.at[i, col_stat]      = stat_val
+    df_r[col_avg]      = out_avg
+    df_r[col_avg_corr] = out_corr
+    df_r[col_stat]     = out_stat
 
     # --- zapis raportu w to samo miejsce ---
     try:
         if raport_path.suffix.lower() in (".xlsx", ".xls"):
-            df_r.to_excel(raport_path, index=False)
+            _write_excel(df_r, raport_path)
         else:
             df_r.to_csv(raport_path, index=False, encoding="utf-8-sig")
     except PermissionError:
@@ -4,8 +4,10 @@
 from __future__ import annotations
 import csv
 import os
+from dataclasses import dataclass
 import signal
 import sys
+import tempfile
 import time
 import threading
 import subprocess
@@ -24,6 +26,13 @@ VOIVODESHIPS = [
     "Mazowieckie","Opolskie","Podkarpackie","Podlaskie","Pomorskie","Śląskie",
     "Świętokrzyskie","Warmińsko-Mazurskie","Wielkopolskie","Zachodniopomorskie",
 ]
+TIMING_FIELDS = [
+    "region","phase","status","processed","total","updated_at",
+    "delay_min","delay_max",
+]
+# po ilu wpisach dziennika zrzucamy pełny snapshot timing.csv
+JOURNAL_COMPACT_AFTER = 256
+
 DELAY_MIN = 4.0
 DELAY_MAX = 6.0
 RETRIES   = 3
@@ -31,25 +40,50 @@ SOFT_STOP_MORE = 10   # ile ogłoszeń „dokończyć” po kliknięciu Zatrzyma
 
 IS_FROZEN = getattr(sys, "frozen", False)
 
+# klasyfikacja linii terminala – jedna skompilowana alternatywa na kategorię
+# zamiast trzech pętli `any(k in s ...)` na każdą linię logu
+_ERR_RE  = re.compile(r"fatal|error|błąd|traceback|\[x\]|\[err\]")
+_WARN_RE = re.compile(r"warn|ostrzeż|\[warn\]")
+_OK_RE   = re.compile(r"\[ok\]|gotowe|zakończono|done")
+
 
 # ============================ utils ============================
 
-def _normalize_region_slug(name: str) -> str:
-    """np. 'Warmińsko-Mazurskie' -> 'warminsko-mazurskie' (slug dla --region)"""
-    s = (name or "").strip().lower()
-    # KLUCZ: 'ł' nie rozkłada się w NFKD -> zamieniamy ręcznie
-    s = s.replace("ł", "l").replace("Ł", "l")
-    # usuń diakrytyki z reszty
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+_RE_SLUG_WS     = re.compile(r"\s+")
+_RE_SLUG_BAD    = re.compile(r"[^a-z0-9\-]+")
+_RE_SLUG_DASHES = re.compile(r"-{2,}")
+
+# polskie diakrytyki jedną tablicą translate (w tym 'ł', którego NFKD nie
+# rozkłada) zamiast NFKD + filtra combining() znak po znaku
+_DIACRITIC_MAP = str.maketrans({
+    "ą": "a", "ć": "c", "ę": "e", "ł": "l", "ń": "n",
+    "ó": "o", "ś": "s", "ź": "z", "ż": "z",
+})
+
+
+def _region_slug_slow(name: str) -> str:
+    s = (name or "").strip().lower().translate(_DIACRITIC_MAP)
+    if not s.isascii():
+        # znaki spoza polskiego alfabetu – pełna ścieżka NFKD jak dawniej
+        s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
     # spacje -> '-'
-    s = re.sub(r"\s+", "-", s)
+    s = _RE_SLUG_WS.sub("-", s)
     # tylko a-z0-9-
-    s = re.sub(r"[^a-z0-9\-]+", "", s)
+    s = _RE_SLUG_BAD.sub("", s)
     # zredukuj wielokrotne myślniki do jednego
-    s = re.sub(r"-{2,}", "-", s).strip("-")
+    s = _RE_SLUG_DASHES.sub("-", s).strip("-")
     return s
 
 
+# wejścia pochodzą z zamkniętej 16-elementowej listy – slugi liczymy raz
+REGION_SLUG = {name: _region_slug_slow(name) for name in VOIVODESHIPS}
+
+
+def _normalize_region_slug(name: str) -> str:
+    """np. 'Warmińsko-Mazurskie' -> 'warminsko-mazurskie' (slug dla --region)"""
+    return REGION_SLUG.get(name) or _region_slug_slow(name)
+
+
 def _raise_in_thread(thread: threading.Thread, exctype=SystemExit) -> bool:
     """Wstrzykuj wyjątek do wskazanego wątku (łagodne wyjście)."""
     ident = getattr(thread, "ident", None)
@@ -63,6 +97,16 @@ def _raise_in_thread(thread: threading.Thread, exctype=SystemExit) -> bool:
     return res == 1
 
 
+@dataclass
+class RegionState:
+    """Stan uruchomienia jednego województwa (proces/wątek/etap/miękki stop)."""
+    proc: subprocess.Popen | None = None
+    thread: threading.Thread | None = None
+    stage: str | None = None                 # 'links' | 'ads'
+    soft_stop_target: int | None = None      # docelowa liczba wierszy
+    monitor: threading.Thread | None = None  # wątek monitorujący miękki stop
+
+
 # ============================ OKNO BAZY DANYCH ============================
 
 class BazaDanychWindow(tk.Toplevel):
@@ -81,22 +125,40 @@ class BazaDanychWindow(tk.Toplevel):
         self.links_dir = self.base_dir / "linki"
         self.out_dir   = self.base_dir / "województwa"
         self.timing_csv = self.base_dir / "timing.csv"
+        self.timing_journal = self.base_dir / "timing.journal.csv"
         self.logs_dir  = self.base_dir / "logs"
 
-        # uruchomienia / etapy
-        self.proc_by_region: dict[str, subprocess.Popen] = {}
-        self.thread_by_region: dict[str, threading.Thread] = {}
-        self.stage_by_region: dict[str, str] = {}  # 'links' | 'ads'
+        # uruchomienia / etapy / miękkie zatrzymanie – jeden rekord na region
+        self.regions: dict[str, RegionState] = {}
         self.active_region: str | None = None      # jedyny aktywny region
 
-        # miękkie zatrzymanie
-        self.soft_stop_targets: dict[str, int] = {}                # region -> docelowa liczba wierszy
-        self.soft_stop_monitors: dict[str, threading.Thread] = {}  # region -> wątek monitorujący
+        # gotowe pary (plik linków, plik wynikowy) – bez Path-joinów w pętlach
+        self._region_paths: dict[str, tuple[Path, Path]] = self._build_region_paths()
 
         # sterowanie UI
         self._lock_start_until_stop = False
         self._suspend_select_events = False  # nie wywołuj handlerów select podczas odświeżania
 
+        # cache timing.csv – parsujemy tylko gdy stat plików się zmienił
+        self._timing_cache: dict[str, dict] | None = None
+        self._timing_stat: tuple | None = None
+        self._journal_lines = 0
+
+        # cache liczników wierszy per plik – niezmieniony stat = zero I/O
+        self._links_count_cache: dict[str, tuple[int, int, int, bool]] = {}
+        self._ads_count_cache: dict[str, tuple[int, int, int]] = {}
+
+        # ostatnio wpisane wartości wierszy drzewka – aktualizujemy różnicowo
+        self._row_cache: dict[str, tuple] = {}
+
+        # bufor linii terminala – zrzucany co ~50 ms jednym insertem na tag
+        self._term_buf: list[tuple[str, str | None]] = []
+        self._term_flush_scheduled = False
+
+        # ostatni zapisany stan (phase, status, done, total) per region –
+        # tyknięcie bez zmian nie zapisuje nic i nie odświeża UI
+        self._last_snapshot: dict[str, tuple[str, str, int, int]] = {}
+
         self._ensure_minimal_structure()
         self._build_ui()
         self.refresh()
@@ -115,10 +177,7 @@ class BazaDanychWindow(tk.Toplevel):
         self.logs_dir.mkdir(parents=True, exist_ok=True)
         if not self.timing_csv.exists():
             with self.timing_csv.open("w", encoding="utf-8-sig", newline="") as f:
-                w = csv.DictWriter(f, fieldnames=[
-                    "region","phase","status","processed","total","updated_at",
-                    "delay_min","delay_max"
-                ])
+                w = csv.DictWriter(f, fieldnames=TIMING_FIELDS)
                 w.writeheader()
 
     # ---------- UI ----------
@@ -199,13 +258,32 @@ class BazaDanychWindow(tk.Toplevel):
 
     # ---------- terminal helpers ----------
     def _term_write(self, text: str, tag: str | None = None):
-        """Dopisuje linię do terminala z opcjonalnym tagiem kolorującym."""
+        """Buforuje linię do terminala z opcjonalnym tagiem kolorującym."""
         if not hasattr(self, "term_text"):
             return
+        self._term_buf.append((text if text.endswith("\n") else text + "\n", tag))
+        if not self._term_flush_scheduled:
+            self._term_flush_scheduled = True
+            try:
+                self.after(50, self._term_flush)
+            except Exception:
+                self._term_flush_scheduled = False
+
+    def _term_flush(self):
+        self._term_flush_scheduled = False
+        buf, self._term_buf = self._term_buf, []
+        if not buf or not hasattr(self, "term_text"):
+            return
         self.term_text.configure(state="normal")
-        self.term_text.insert("end", text, (tag,) if tag else ())
-        if not text.endswith("\n"):
-            self.term_text.insert("end", "\n", (tag,) if tag else ())
+        # sąsiednie linie z tym samym tagiem sklejamy w jeden insert
+        i, n = 0, len(buf)
+        while i < n:
+            tag = buf[i][1]
+            j = i + 1
+            while j < n and buf[j][1] == tag:
+                j += 1
+            self.term_text.insert("end", "".join(t for t, _ in buf[i:j]), (tag,) if tag else ())
+            i = j
         self.term_text.see("end")
         self.term_text.configure(state="disabled")
 
@@ -215,11 +293,11 @@ class BazaDanychWindow(tk.Toplevel):
         self.term_text.delete("1.0", "end")
         self.term_text.configure(state="disabled")
 
-    def _term_autotag(self, line: str) -> str | None:
-        s = line.strip().lower()
-        if any(k in s for k in ["fatal", "error", "błąd", "traceback", "[x]", "[err]"]): return "ERR"
-        if any(k in s for k in ["warn", "ostrzeż", "[warn]"]): return "WARN"
-        if any(k in s for k in ["[ok]", "gotowe", "zakończono", "done"]): return "OK"
+    def _term_autotag(self, line_lower: str) -> str | None:
+        # wywołujący podaje linię już zlowercase'owaną – jedna alokacja mniej
+        if _ERR_RE.search(line_lower):  return "ERR"
+        if _WARN_RE.search(line_lower): return "WARN"
+        if _OK_RE.search(line_lower):   return "OK"
         return "INFO"
 
     @contextlib.contextmanager
@@ -228,7 +306,7 @@ class BazaDanychWindow(tk.Toplevel):
         class _Writer(io.TextIOBase):
             def write(_self, s):
                 for line in str(s).splitlines():
-                    tag = self._term_autotag(line)
+                    tag = self._term_autotag(line.lower())
                     self._term_write(f"{prefix}{line}", tag)
                 return len(s)
         old_out, old_err = sys.stdout, sys.stderr
@@ -248,64 +326,185 @@ class BazaDanychWindow(tk.Toplevel):
         self.out_dir   = self.base_dir / "województwa"
         self.logs_dir  = self.base_dir / "logs"
         self.timing_csv = self.base_dir / "timing.csv"
+        self.timing_journal = self.base_dir / "timing.journal.csv"
+        self._timing_cache = None
+        self._timing_stat = None
+        self._journal_lines = 0
+        self._region_paths = self._build_region_paths()
         self._ensure_minimal_structure()
         self.refresh()
 
     # ---------- odczyty pomocnicze ----------
-    def _read_links_count(self, f: Path) -> int:
-        if not f.exists(): return 0
+    def _read_links_count(self, f: Path, st=None) -> int:
+        # st: gotowy wynik os.stat()/DirEntry.stat(), () = plik nie istnieje,
+        # None = sprawdź samodzielnie
+        key = str(f)
+        if st is None:
+            try:
+                st = os.stat(f)
+            except OSError:
+                st = ()
+        if not st:
+            self._links_count_cache.pop(key, None)
+            return 0
+        cached = self._links_count_cache.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            # 1 kolumna, nagłówek 'link': liczba wierszy = linie - 1
+            return max(0, cached[2] + (0 if cached[3] else 1) - 1)
         try:
-            with f.open("r", encoding="utf-8-sig", newline="") as fh:
-                # 1 kolumna, nagłówek 'link'
-                return max(0, sum(1 for _ in fh) - 1)
+            if cached and 0 < cached[1] < st.st_size:
+                # plik tylko urósł – doliczamy newline'y z samego ogona
+                with open(f, "rb") as fh:
+                    fh.seek(cached[1])
+                    tail = fh.read()
+                newlines = cached[2] + tail.count(b"\n")
+                ends_nl = tail.endswith(b"\n")
+            else:
+                with open(f, "rb") as fh:
+                    buf = fh.read()
+                newlines = buf.count(b"\n")
+                ends_nl = (not buf) or buf.endswith(b"\n")
         except Exception:
             return 0
+        self._links_count_cache[key] = (st.st_mtime_ns, st.st_size, newlines, ends_nl)
+        return max(0, newlines + (0 if ends_nl else 1) - 1)
 
-    def _read_processed_count(self, f: Path) -> int:
-        if not f.exists(): return 0
+    def _read_processed_count(self, f: Path, strict: bool = False, st=None) -> int:
+        key = str(f)
+        if st is None:
+            try:
+                st = os.stat(f)
+            except OSError:
+                st = ()
+        if not st:
+            self._ads_count_cache.pop(key, None)
+            return 0
+        cached = self._ads_count_cache.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
         try:
-            with f.open("r", encoding="utf-8-sig", newline="") as fh:
-                # CSV z nagłówkiem – licz wiersze danych
-                rd = csv.reader(fh)
-                first = True
-                n = 0
-                for row in rd:
-                    if first:
-                        first = False
-                        continue
-                    if row and any(c.strip() for c in row):
-                        n += 1
-                return n
+            if strict:
+                with f.open("r", encoding="utf-8-sig", newline="") as fh:
+                    # CSV z nagłówkiem – licz niepuste wiersze danych
+                    rd = csv.reader(fh)
+                    first = True
+                    n = 0
+                    for row in rd:
+                        if first:
+                            first = False
+                            continue
+                        if row and any(c.strip() for c in row):
+                            n += 1
+            else:
+                # do paska postępu wystarczy zliczenie linii w C
+                # (nagłówek odejmujemy, ostatnia linia bez '\n' też się liczy)
+                with open(f, "rb") as fh:
+                    buf = fh.read()
+                ends_nl = (not buf) or buf.endswith(b"\n")
+                n = max(0, buf.count(b"\n") + (0 if ends_nl else 1) - 1)
         except Exception:
             return 0
+        self._ads_count_cache[key] = (st.st_mtime_ns, st.st_size, n)
+        return n
+
+    def _timing_stat_key(self) -> tuple:
+        def _k(p: Path):
+            try:
+                st = os.stat(p)
+            except OSError:
+                return None
+            return (st.st_mtime_ns, st.st_size)
+        return (_k(self.timing_csv), _k(self.timing_journal))
 
     def _load_timing(self) -> dict[str, dict]:
+        key = self._timing_stat_key()
+        if key[0] is None:
+            self._timing_cache = None
+            self._timing_stat = None
+            return {}
+        if self._timing_cache is not None and self._timing_stat == key:
+            return self._timing_cache
         log: dict[str, dict] = {}
-        if not self.timing_csv.exists():
-            return log
         with self.timing_csv.open("r", encoding="utf-8-sig", newline="") as f:
             rd = csv.DictReader(f)
             for r in rd:
                 log[r.get("region","")] = r
+        # dogrywka z dziennika przyrostowego – ostatni wpis dla regionu wygrywa
+        self._journal_lines = 0
+        if key[1] is not None:
+            with self.timing_journal.open("r", encoding="utf-8", newline="") as f:
+                for row in csv.reader(f):
+                    if len(row) == len(TIMING_FIELDS):
+                        r = dict(zip(TIMING_FIELDS, row))
+                        log[r["region"]] = r
+                    self._journal_lines += 1
+        # typy normalizujemy raz przy wczytaniu – refresh() czyta pola
+        # bez int()/or-fallbacków na każdym tyknięciu
+        for r in log.values():
+            try:
+                r["total"] = int(r.get("total") or 0)
+            except (TypeError, ValueError):
+                r["total"] = 0
+            r["phase"] = r.get("phase") or ""
+            r["status"] = r.get("status") or ""
+            r["updated_at"] = r.get("updated_at") or "-"
+        self._timing_cache = log
+        self._timing_stat = key
         return log
 
     def _save_timing_row(self, region: str, phase: str, status: str, processed: int, total: int):
+        self._save_timing_rows_bulk([(region, phase, status, processed, total)])
+
+    def _save_timing_rows_bulk(self, updates: list[tuple[str, str, str, int, int]]):
+        """Nakłada paczkę aktualizacji jednym otwarciem dziennika."""
+        if not updates:
+            return
         rows = self._load_timing()
-        rows[region] = {
-            "region": region,
-            "phase": phase,
-            "status": status,
-            "processed": str(processed),
-            "total": str(total),
-            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "delay_min": str(DELAY_MIN),
-            "delay_max": str(DELAY_MAX),
-        }
-        with self.timing_csv.open("w", encoding="utf-8-sig", newline="") as f:
-            w = csv.DictWriter(f, fieldnames=["region","phase","status","processed","total","updated_at","delay_min","delay_max"])
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # jedna dopisana paczka zamiast przepisywania całego timing.csv
+        with self.timing_journal.open("a", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            for region, phase, status, processed, total in updates:
+                # total jako int – spójnie z normalizacją w _load_timing;
+                # csv.writer i tak zserializuje do tekstu
+                rows[region] = {
+                    "region": region,
+                    "phase": phase,
+                    "status": status,
+                    "processed": str(processed),
+                    "total": int(total),
+                    "updated_at": now,
+                    "delay_min": str(DELAY_MIN),
+                    "delay_max": str(DELAY_MAX),
+                }
+                w.writerow([rows[region][k] for k in TIMING_FIELDS])
+                self._journal_lines += 1
+        self._timing_cache = rows
+        if self._journal_lines > JOURNAL_COMPACT_AFTER:
+            self._compact_timing(rows)
+        else:
+            self._timing_stat = self._timing_stat_key()
+
+    def _compact_timing(self, rows: dict[str, dict] | None = None):
+        """Zrzuca pełny stan do timing.csv i czyści dziennik przyrostowy."""
+        if rows is None:
+            rows = self._load_timing()
+        # zapis do pliku tymczasowego + atomowy rename: padnięcie w trakcie
+        # zapisu nie zostawia obciętego timing.csv
+        tmp = self.timing_csv.with_suffix(".csv.tmp")
+        with tmp.open("w", encoding="utf-8-sig", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=TIMING_FIELDS)
             w.writeheader()
             for _, r in rows.items():
                 w.writerow(r)
+        os.replace(tmp, self.timing_csv)
+        try:
+            self.timing_journal.unlink()
+        except OSError:
+            pass
+        self._journal_lines = 0
+        self._timing_cache = rows
+        self._timing_stat = self._timing_stat_key()
 
     # ---------- wybór ----------
     def _on_select_iid(self, _evt=None):
@@ -320,18 +519,36 @@ class BazaDanychWindow(tk.Toplevel):
         iid = sel[0]
         return self.tree.set(iid, "region") or iid
 
+    def _build_region_paths(self) -> dict[str, tuple[Path, Path]]:
+        return {r: (self.links_dir / f"{r}.csv", self.out_dir / f"{r}.csv")
+                for r in VOIVODESHIPS}
+
+    def _paths_for(self, region: str) -> tuple[Path, Path]:
+        p = self._region_paths.get(region)
+        if p is None:
+            p = self._region_paths[region] = (self.links_dir / f"{region}.csv",
+                                              self.out_dir / f"{region}.csv")
+        return p
+
+    def _region_state(self, region: str) -> RegionState:
+        st = self.regions.get(region)
+        if st is None:
+            st = self.regions[region] = RegionState()
+        return st
+
+    @staticmethod
+    def _state_alive(st: RegionState | None) -> bool:
+        return bool(st) and ((st.thread and st.thread.is_alive())
+                             or (st.proc and st.proc.poll() is None))
+
     def _any_running(self) -> str | None:
-        if self.active_region is not None:
-            t = self.thread_by_region.get(self.active_region)
-            p = self.proc_by_region.get(self.active_region)
-            if (t and t.is_alive()) or (p and p.poll() is None):
-                return self.active_region
-            else:
-                self.active_region = None
-        for r, p in self.proc_by_region.items():
-            if p and p.poll() is None: return r
-        for r, t in self.thread_by_region.items():
-            if t and t.is_alive(): return r
+        # każdy start ustawia active_region, każdy teardown go czyści –
+        # wystarczy zweryfikować ten jeden rekord zamiast skanować wszystkie
+        if self.active_region is None:
+            return None
+        if self._state_alive(self.regions.get(self.active_region)):
+            return self.active_region
+        self.active_region = None
         return None
 
     def _update_start_button_state(self):
@@ -341,46 +558,47 @@ class BazaDanychWindow(tk.Toplevel):
 
     # ---------- odświeżanie ----------
     def refresh(self):
-        prev_sel = tuple(self.tree.selection())
-        prev_focus = self.tree.focus() if self.tree.focus() else (prev_sel[0] if prev_sel else "")
-        prev_yview = self.tree.yview()
-
-        self.tree.delete(*self.tree.get_children())
         log = self._load_timing()
 
+        # jeden scandir na katalog zamiast 2×16 stat() po ścieżkach
+        def _dir_stats(d: Path) -> dict:
+            try:
+                with os.scandir(d) as it:
+                    return {e.name: e.stat() for e in it if e.is_file()}
+            except OSError:
+                return {}
+        links_stats = _dir_stats(self.links_dir)
+        out_stats   = _dir_stats(self.out_dir)
+
         for region in VOIVODESHIPS:
-            lf = self.links_dir / f"{region}.csv"
-            of = self.out_dir   / f"{region}.csv"
-            total = self._read_links_count(lf)
-            done  = self._read_processed_count(of)
-            if region in log:
-                try: total = max(total, int(log[region].get("total") or 0))
-                except ValueError: pass
+            lf, of = self._region_paths[region]
+            name = lf.name
+            total = self._read_links_count(lf, st=links_stats.get(name, ()))
+            done  = self._read_processed_count(of, st=out_stats.get(name, ()))
+            row = log.get(region)
+            if row is not None:
+                total = max(total, row["total"])
             pct = f"{(done/total*100):.1f}%" if total else "-"
-            phase = log.get(region, {}).get("phase") or ("links" if total == 0 else "ads")
-            status = log.get(region, {}).get("status") or "Brak/Stop"
-            updated = log.get(region, {}).get("updated_at") or "-"
+            phase   = (row["phase"] if row else "") or ("links" if total == 0 else "ads")
+            status  = (row["status"] if row else "") or "Brak/Stop"
+            updated = row["updated_at"] if row else "-"
 
-            if region in self.soft_stop_targets:
+            st = self.regions.get(region)
+            if st and st.soft_stop_target is not None:
                 status = "Kończenie (+10)…"
 
-            if (region in self.proc_by_region and self.proc_by_region[region].poll() is None) \
-               or (region in self.thread_by_region and self.thread_by_region[region].is_alive()):
+            if self._state_alive(st):
                 status = "W trakcie"
 
-            self.tree.insert("", "end", iid=region,
-                             values=(region, phase, status, f"{done}/{total}", pct, updated))
-
-        try:
-            if prev_focus and self.tree.exists(prev_focus):
-                self.tree.focus(prev_focus); self.tree.selection_set(prev_focus); self.tree.see(prev_focus)
-            elif prev_sel:
-                for iid in prev_sel:
-                    if self.tree.exists(iid):
-                        self.tree.selection_set(iid); self.tree.focus(iid); self.tree.see(iid); break
-        except Exception: pass
-        try: self.tree.yview_moveto(prev_yview[0])
-        except Exception: pass
+            # różnicowo: komenda Tk idzie tylko do wierszy, które się zmieniły;
+            # zaznaczenie/fokus/scroll zostają nietknięte same z siebie
+            new_values = (region, phase, status, f"{done}/{total}", pct, updated)
+            if not self.tree.exists(region):
+                self.tree.insert("", "end", iid=region, values=new_values)
+                self._row_cache[region] = new_values
+            elif self._row_cache.get(region) != new_values:
+                self.tree.item(region, values=new_values)
+                self._row_cache[region] = new_values
 
     def _safe_refresh(self):
         self._suspend_select_events = True
@@ -395,8 +613,7 @@ class BazaDanychWindow(tk.Toplevel):
         if not region:
             return
 
-        lf = self.links_dir / f"{region}.csv"
-        of = self.out_dir   / f"{region}.csv"
+        lf, of = self._paths_for(region)
         total = self._read_links_count(lf)
         done  = self._read_processed_count(of)
 
@@ -430,11 +647,10 @@ class BazaDanychWindow(tk.Toplevel):
         if not region:
             return
 
-        th = self.thread_by_region.get(region)
-        pr = self.proc_by_region.get(region)
+        st = self.regions.get(region)
 
         # jeśli coś działa – miękkie zatrzymanie + kolor ŻÓŁTY
-        if (th and th.is_alive()) or (pr and pr.poll() is None):
+        if self._state_alive(st):
             try:
                 self.btn_stop.config(bg="#f7e26b", activebackground="#f5d742")
             except Exception:
@@ -450,14 +666,11 @@ class BazaDanychWindow(tk.Toplevel):
             return
 
         # nic nie działa – zwykłe zatrzymanie stanu + reset koloru
-        lf = self.links_dir / f"{region}.csv"; of = self.out_dir / f"{region}.csv"
+        lf, of = self._paths_for(region)
         total = self._read_links_count(lf); done = self._read_processed_count(of)
 
-        self.proc_by_region.pop(region, None)
-        self.thread_by_region.pop(region, None)
-        self.stage_by_region.pop(region, None)
+        self.regions.pop(region, None)
         self.active_region = None
-        self.soft_stop_targets.pop(region, None)
 
         phase = "links" if total == 0 else "ads"
         self._save_timing_row(region, phase, "Stop", done, total)
@@ -479,7 +692,7 @@ class BazaDanychWindow(tk.Toplevel):
                     self._term_write(f"Import linki_mieszkania nieudany: {e}", "ERR")
                     messagebox.showerror("Baza danych", f"Import linki_mieszkania nieudany:\n{e}")
                     return
-                self.stage_by_region[_region] = "links"
+                self._region_state(_region).stage = "links"
                 old_argv = sys.argv
                 sys.argv = ["linki_mieszkania.py", "--region", _normalize_region_slug(_region), "--output", str(_lf)]
                 try:
@@ -493,7 +706,7 @@ class BazaDanychWindow(tk.Toplevel):
                     sys.argv = old_argv
 
         th = threading.Thread(target=worker, args=(region, lf), daemon=True)
-        self.thread_by_region[region] = th
+        self._region_state(region).thread = th
         th.start()
         self.active_region = region
 
@@ -506,7 +719,7 @@ class BazaDanychWindow(tk.Toplevel):
                     self._term_write(f"Import scrapera nieudany: {e}", "ERR")
                     messagebox.showerror("Baza danych", f"Import scrapera nieudany:\n{e}")
                     return
-                self.stage_by_region[_region] = "ads"
+                self._region_state(_region).stage = "ads"
                 old_argv = sys.argv
                 sys.argv = [
                     "scraper_otodom_mieszkania.py","--input",str(_lf),"--output",str(_of),
@@ -523,7 +736,7 @@ class BazaDanychWindow(tk.Toplevel):
                     sys.argv = old_argv
 
         th = threading.Thread(target=worker, args=(region, lf, of), daemon=True)
-        self.thread_by_region[region] = th
+        self._region_state(region).thread = th
         th.start()
         self.active_region = region
 
@@ -545,22 +758,51 @@ class BazaDanychWindow(tk.Toplevel):
                 creationflags=(subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0),
                 env=env
             )
-            self.proc_by_region[region] = proc
-            self.stage_by_region[region] = stage
+            st = self._region_state(region)
+            st.proc = proc
+            st.stage = stage
             self.active_region = region
 
             # strumień -> terminal (własne dekodowanie UTF-8 z errors="replace")
             def _reader():
                 prefix = f"[{region}][{stage.upper()}] "
+
+                def _emit_batch(batch):
+                    for text, tag in batch:
+                        self._term_write(text, tag)
+
+                def _post(lines):
+                    batch = []
+                    for raw in lines:
+                        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                        batch.append((prefix + line, self._term_autotag(line.lower())))
+                    try:
+                        # jedna wizyta w pętli Tk na porcję, nie na linię
+                        self.after(0, _emit_batch, batch)
+                    except Exception:
+                        pass
+
                 try:
                     if proc.stdout is None:
                         return
-                    for raw in iter(proc.stdout.readline, b""):
-                        if not raw:
+                    # duże odczyty + własny podział na linie zamiast readline():
+                    # jeden syscall na ~64 KiB zamiast jednego na linię
+                    fd = proc.stdout.fileno()
+                    carry = b""
+                    while True:
+                        try:
+                            chunk = os.read(fd, 65536)
+                        except OSError:
                             break
-                        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
-                        tag = self._term_autotag(line)
-                        self._term_write(prefix + line, tag)
+                        if not chunk:
+                            break
+                        data = carry + chunk
+                        lines = data.split(b"\n")
+                        carry = lines.pop()
+                        if lines:
+                            _post(lines)
+                    if carry:
+                        _post([carry])
                 except Exception as e:
                     self._term_write(f"{prefix}<<reader exception: {e}>>", "ERR")
 
@@ -573,8 +815,7 @@ class BazaDanychWindow(tk.Toplevel):
     def _start_ads_for(self, region: str):
         if self._any_running() or (self.active_region and self.active_region != region):
             return
-        lf = self.links_dir / f"{region}.csv"
-        of = self.out_dir   / f"{region}.csv"
+        lf, of = self._paths_for(region)
         total = self._read_links_count(lf); done = self._read_processed_count(of)
         if total == 0: return
         self._save_timing_row(region, "ads", "W trakcie", done, total)
@@ -594,29 +835,51 @@ class BazaDanychWindow(tk.Toplevel):
     # ---------- monitor miękkiego stopu ----------
     def _start_soft_stop_monitor(self, region: str):
         """Po kliknięciu 'Zatrzymaj' monitoruje plik i po +SOFT_STOP_MORE wierszach kończy scraper."""
-        if region in self.soft_stop_monitors and self.soft_stop_monitors[region].is_alive():
+        state = self._region_state(region)
+        if state.monitor and state.monitor.is_alive():
             return
 
-        lf = self.links_dir / f"{region}.csv"
-        of = self.out_dir   / f"{region}.csv"
+        lf, of = self._paths_for(region)
         baseline = self._read_processed_count(of)
         target = baseline + SOFT_STOP_MORE
-        self.soft_stop_targets[region] = target
+        state.soft_stop_target = target
 
         def monitor():
             try:
+                last_size = -1
                 while True:
-                    time.sleep(1.0)
-                    th = self.thread_by_region.get(region)
-                    pr = self.proc_by_region.get(region)
-                    alive = (th and th.is_alive()) or (pr and pr.poll() is None)
-                    if not alive:
+                    st = self.regions.get(region)
+                    th = st.thread if st else None
+                    pr = st.proc if st else None
+                    # blokujące czekanie zamiast sleep(1.0) – budzimy się od razu
+                    # gdy dziecko się kończy
+                    if pr is not None:
+                        try:
+                            pr.wait(timeout=0.5)
+                            break
+                        except subprocess.TimeoutExpired:
+                            pass
+                    elif th is not None and th.is_alive():
+                        th.join(timeout=0.5)
+                        if not th.is_alive():
+                            break
+                    else:
                         break
 
+                    # wiersze przeliczamy tylko gdy plik wyjściowy urósł
+                    try:
+                        size = os.stat(of).st_size
+                    except OSError:
+                        size = -1
+                    if size == last_size:
+                        continue
+                    last_size = size
                     done = self._read_processed_count(of)
+                    if done < target:
+                        continue
 
                     # DEV: proces — ubij po limicie
-                    if pr and pr.poll() is None and done >= target:
+                    if pr and pr.poll() is None:
                         try:
                             if os.name == "nt":
                                 pr.send_signal(signal.CTRL_BREAK_EVENT)
@@ -630,15 +893,12 @@ class BazaDanychWindow(tk.Toplevel):
                         break
 
                     # EXE/Toplevel: wątek — wstrzyknij SystemExit
-                    if th and th.is_alive() and done >= target:
+                    if th and th.is_alive():
                         _raise_in_thread(th, SystemExit)
                         break
             finally:
                 # porządki i zapis stanu
-                self.proc_by_region.pop(region, None)
-                self.thread_by_region.pop(region, None)
-                self.stage_by_region.pop(region, None)
-                self.soft_stop_targets.pop(region, None)
+                self.regions.pop(region, None)
                 total_links = self._read_links_count(lf)
                 done_now    = self._read_processed_count(of)
                 phase = "ads" if total_links > 0 else "links"
@@ -654,52 +914,43 @@ class BazaDanychWindow(tk.Toplevel):
                     pass
 
         t = threading.Thread(target=monitor, daemon=True)
-        self.soft_stop_monitors[region] = t
+        state.monitor = t
         t.start()
 
     # ---------- AUTO-REFRESH ----------
     def _auto_refresh(self):
         changed = False
-
-        # DEV: procesy
-        for region, proc in list(self.proc_by_region.items()):
-            alive = proc.poll() is None
-            lf = self.links_dir / f"{region}.csv"; of = self.out_dir / f"{region}.csv"
+        # cały tick zbieramy do jednej paczki zapisu; wyjątkiem jest
+        # przejście links->ads, bo _start_ads_for sam dopisuje swój wiersz
+        # i kolejność wpisów w dzienniku ma znaczenie
+        updates: list[tuple[str, str, str, int, int]] = []
+
+        # DEV: procesy i wątki EXE/Toplevel – jeden rekord na region
+        for region, st in list(self.regions.items()):
+            if st.proc is None and st.thread is None:
+                continue
+            lf, of = self._paths_for(region)
             total = self._read_links_count(lf); done = self._read_processed_count(of)
-            stage = self.stage_by_region.get(region)
-            if not alive:
+            stage = st.stage
+            if not self._state_alive(st):
+                self._last_snapshot.pop(region, None)
                 if stage == "links" and total > 0:
-                    self.proc_by_region.pop(region, None); self.stage_by_region.pop(region, None)
+                    self.regions.pop(region, None)
                     self._save_timing_row(region, "links", "Stop", done, total); changed = True
                     self.active_region = None
                     self._start_ads_for(region); continue
-                self._save_timing_row(region, "ads", "Stop", done, total)
-                self.proc_by_region.pop(region, None); self.stage_by_region.pop(region, None)
+                updates.append((region, "ads", "Stop", done, total))
+                self.regions.pop(region, None)
                 self.active_region = None
                 changed = True
             else:
                 cur_phase = stage or ("ads" if total > 0 else "links")
-                self._save_timing_row(region, cur_phase, "W trakcie", done, total); changed = True
-
-        # WĄTKI
-        for region, th in list(self.thread_by_region.items()):
-            lf = self.links_dir / f"{region}.csv"; of = self.out_dir / f"{region}.csv"
-            total = self._read_links_count(lf); done = self._read_processed_count(of)
-            stage = self.stage_by_region.get(region)
-            if not th.is_alive():
-                if stage == "links" and total > 0:
-                    self.thread_by_region.pop(region, None); self.stage_by_region.pop(region, None)
-                    self._save_timing_row(region, "links", "Stop", done, total); changed = True
-                    self.active_region = None
-                    self._start_ads_for(region); continue
-                self._save_timing_row(region, "ads", "Stop", done, total)
-                self.thread_by_region.pop(region, None); self.stage_by_region.pop(region, None)
-                self.active_region = None
-                changed = True
-            else:
-                cur_phase = stage or ("ads" if total > 0 else "links")
-                self._save_timing_row(region, cur_phase, "W trakcie", done, total); changed = True
+                snap = (cur_phase, "W trakcie", done, total)
+                if self._last_snapshot.get(region) != snap:
+                    self._last_snapshot[region] = snap
+                    updates.append((region, cur_phase, "W trakcie", done, total)); changed = True
 
+        self._save_timing_rows_bulk(updates)
         if changed:
             self._safe_refresh()
         self.after(2000, self._auto_refresh)
@@ -714,50 +965,95 @@ class BazaDanychWindow(tk.Toplevel):
         except Exception:
             pass
 
-        def worker():
+        def on_done():
             try:
-                import scalanie as _scal
-                # zapamiętaj obecne argumenty
-                old_argv = sys.argv[:]  # kopia listy
-                # ustaw argv tak, jakbyśmy uruchamiali scalanie z konsoli
-                sys.argv = [
-                    "scalanie.py",
-                    "--input", str(self.out_dir),
-                    "--output", str(xlsx_path),
-                ]
+                self.btn_scal.config(bg="#8ef98e", activebackground="#76e476")
+            except Exception:
+                pass
+            msg = "Zakończono scalanie do Polska.xlsx."
+            if not xlsx_path.exists():
+                msg += "\n(Uwaga: nie widzę pliku wynikowego w bazie.)"
+            else:
+                msg += f"\nPlik zapisano jako:\n{xlsx_path}"
+            messagebox.showinfo("Scalanie", msg)
+
+        def on_err(e):
+            try:
+                self.btn_scal.config(bg="#f28b82", activebackground="#ea4335")
+            except Exception:
+                pass
+            messagebox.showerror("Scalanie", f"Błąd scalania:\n{e}")
+
+        if (self.master is not None and not isinstance(self.master, tk.Tk)) or IS_FROZEN:
+            # w aplikacji spakowanej / osadzonej nie odpalimy drugiego
+            # interpretera – zostaje wątek z podmianą argv jak z konsoli
+            def worker():
                 try:
-                    rc = _scal.main()
-                finally:
-                    # zawsze przywróć poprzednie argv
-                    sys.argv = old_argv
-            except Exception as e:
-                def on_err():
+                    import scalanie as _scal
+                    old_argv = sys.argv[:]  # kopia listy
+                    sys.argv = ["scalanie.py", "--base", str(self.base_dir)]
                     try:
-                        self.btn_scal.config(bg="#f28b82", activebackground="#ea4335")
-                    except Exception:
-                        pass
-                    messagebox.showerror("Scalanie", f"Błąd scalania:\n{e}")
-                self.after(0, on_err)
-                return
+                        _scal.main()
+                    finally:
+                        # zawsze przywróć poprzednie argv
+                        sys.argv = old_argv
+                except Exception as e:
+                    self.after(0, on_err, e)
+                    return
+                self.after(0, on_done)
 
-            def on_done():
-                try:
-                    self.btn_scal.config(bg="#8ef98e", activebackground="#76e476")
-                except Exception:
-                    pass
-                msg = "Zakończono scalanie do Polska.xlsx."
-                if not xlsx_path.exists():
-                    msg += "\n(Uwaga: nie widzę pliku wynikowego w bazie.)"
-                else:
-                    msg += f"\nPlik zapisano jako:\n{xlsx_path}"
-                messagebox.showinfo("Scalanie", msg)
+            threading.Thread(target=worker, daemon=True).start()
+            return
+
+        # tryb deweloperski: osobny proces jak przy etapach links/ads –
+        # scalanie nie konkuruje o GIL z pętlą Tk i nie dotyka sys.argv;
+        # stan sprawdzamy z after() zamiast blokować wątek
+        script = Path(__file__).with_name("scalanie.py")
+        if not script.exists():
+            on_err(f"Nie znaleziono pliku: {script}")
+            return
+        cmd = [sys.executable, str(script), "--base", str(self.base_dir)]
+        errf = tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace")
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                cwd=str(Path(__file__).parent),
+                stdout=subprocess.DEVNULL,
+                stderr=errf,
+                close_fds=os.name != "nt",
+                creationflags=(subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0),
+            )
+        except Exception as e:
+            errf.close()
+            on_err(e)
+            return
 
-            self.after(0, on_done)
+        def _poll():
+            rc = proc.poll()
+            if rc is None:
+                self.after(250, _poll)
+                return
+            err_tail = ""
+            try:
+                errf.seek(0)
+                err_tail = errf.read().strip()[-800:]
+            except Exception:
+                pass
+            finally:
+                errf.close()
+            if rc == 0:
+                on_done()
+            else:
+                on_err(err_tail or f"kod wyjścia {rc}")
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.after(250, _poll)
 
     # ---------- zamknięcie standalone ----------
     def _on_close_standalone(self):
+        try:
+            self._compact_timing()
+        except Exception:
+            pass
         self.destroy()
         if isinstance(self.master, tk.Tk):
             self.master.destroy()
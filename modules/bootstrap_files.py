@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 from pathlib import Path
-import csv
 
 VOIVODESHIPS = [
     "Dolnośląskie","Kujawsko-Pomorskie","Lubelskie","Lubuskie","Łódzkie",
@@ -16,7 +15,18 @@ LINKS_DIR_NAME = "../../linki"
 OUT_DIR_NAME   = "województwa"
 TIMING_FILE    = "timing.csv"
 
-__all__ = ["prepare_structure", "prepare_app"]
+__all__ = ["prepare_structure", "prepare_app", "fast_read_csv", "fast_write_csv"]
+
+# nagłówki to stałe bez przecinków w polach, więc zamiast csv.writer
+# wystarczy jeden gotowy ciąg bajtów na plik (BOM jak przy utf-8-sig)
+_LINKS_HEADER = "\ufefflink\r\n".encode("utf-8")
+_DATA_HEADER = ("\ufeff" + ",".join([
+    "cena","cena_za_metr","metry","liczba_pokoi","pietro","rynek","rok_budowy",
+    "material","wojewodztwo","powiat","gmina","miejscowosc","dzielnica","ulica","link",
+]) + "\r\n").encode("utf-8")
+_TIMING_HEADER = ("\ufeff" + ",".join(
+    ["ts","region","phase","status","note","last_index","total"]
+) + "\r\n").encode("utf-8")
 
 
 def _ensure_empty_csv(path: Path) -> None:
@@ -30,19 +40,11 @@ def _ensure_empty_csv(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
     if path.parent.name == LINKS_DIR_NAME:
-        with path.open("w", encoding="utf-8-sig", newline="") as fh:
-            w = csv.writer(fh)
-            w.writerow(["link"])
+        path.write_bytes(_LINKS_HEADER)
         return
 
     # Pliki danych (województwa)
-    headers = [
-        "cena","cena_za_metr","metry","liczba_pokoi","pietro","rynek","rok_budowy",
-        "material","wojewodztwo","powiat","gmina","miejscowosc","dzielnica","ulica","link",
-    ]
-    with path.open("w", encoding="utf-8-sig", newline="") as fh:
-        w = csv.writer(fh)
-        w.writerow(headers)
+    path.write_bytes(_DATA_HEADER)
 
 
 def prepare_structure(base_dir: str | Path) -> Path:
@@ -70,9 +72,7 @@ def prepare_structure(base_dir: str | Path) -> Path:
     # timing.csv (utwórz z nagłówkiem, jeśli brak)
     timing = base / TIMING_FILE
     if not timing.exists():
-        with timing.open("w", encoding="utf-8-sig", newline="") as fh:
-            w = csv.writer(fh)
-            w.writerow(["ts","region","phase","status","note","last_index","total"])
+        timing.write_bytes(_TIMING_HEADER)
 
     return base
 
@@ -81,3 +81,32 @@ def prepare_structure(base_dir: str | Path) -> Path:
 def prepare_app(base_dir: str | Path) -> Path:
     """Alias do prepare_structure – zostawiony dla zgodności z importami."""
     return prepare_structure(base_dir)
+
+
+# ---- szybkie czytanie/pisanie CSV dla plików z tej struktury ----
+# importy wewnątrz funkcji: ten moduł ładuje się przy starcie GUI i nie
+# powinien ciągnąć pandas/pyarrow, dopóki ktoś faktycznie nie czyta danych
+
+def fast_read_csv(path: str | Path):
+    """Czyta CSV wielowątkowo przez pyarrow; fallback do pandas bez pyarrow."""
+    import pandas as pd
+    try:
+        import pyarrow.csv as pcsv
+    except ImportError:
+        return pd.read_csv(path)
+    opts = pcsv.ReadOptions(use_threads=True, block_size=1 << 22)
+    # puste pola jako NA, jak w pd.read_csv – nie jako pusty string
+    conv = pcsv.ConvertOptions(strings_can_be_null=True)
+    return (pcsv.read_csv(str(path), read_options=opts, convert_options=conv)
+                .to_pandas(deduplicate_objects=True))
+
+
+def fast_write_csv(df, path: str | Path) -> None:
+    """Zapisuje DataFrame do CSV przez pyarrow; fallback do pandas."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pcsv
+    except ImportError:
+        df.to_csv(path, index=False)
+        return
+    pcsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), str(path))
@@ -17,31 +17,16 @@ def _norm_header(s: str | None) -> str:
             .casefold())
 
 
-def _read_header(ws: Worksheet) -> List[str]:
-    max_c = ws.max_column
-    header = [ws.cell(row=1, column=c).value for c in range(1, max_c + 1)]
+def _trim_header(row: tuple) -> List[str]:
+    header = list(row)
     # obetnij puste ogony
     while header and (header[-1] is None or str(header[-1]).strip() == ""):
         header.pop()
     return [str(h) if h is not None else "" for h in header]
 
 
-def _row_has_data(ws: Worksheet, row: int, max_col: int) -> bool:
-    for c in range(1, max_col + 1):
-        v = ws.cell(row=row, column=c).value
-        if v not in (None, ""):
-            return True
-    return False
-
-
-def _last_filled_row(ws: Worksheet, max_col: int) -> int:
-    r = ws.max_row
-    while r > 1:
-        if _row_has_data(ws, r, max_col):
-            return r
-        r -= 1
-    # jeśli tylko nagłówek jest wypełniony, to "ostatni wypełniony" = 1
-    return 1 if _row_has_data(ws, 1, max_col) else 0
+def _row_has_data(row: tuple) -> bool:
+    return any(v not in (None, "") for v in row)
 
 
 def _pick_target_sheet_name(wb, preferred: str | None, source_name: str) -> str:
@@ -68,75 +53,98 @@ def main():
         print(f"[ERR] Plik nie istnieje: {xlsx}")
         raise SystemExit(1)
 
+    # FAZA 1: odczyt strumieniowy (read_only nie buduje DOM-u całego pliku,
+    # iter_rows oddaje gotowe krotki zamiast odczytów cell-po-cell)
     try:
-        wb = load_workbook(xlsx)
+        wb_ro = load_workbook(xlsx, read_only=True, data_only=True)
     except Exception as e:
         print(f"[ERR] Nie mogę wczytać skoroszytu: {e}")
         raise SystemExit(2)
 
-    if args.source_sheet not in wb.sheetnames:
+    if args.source_sheet not in wb_ro.sheetnames:
         print(f"[ERR] Brak arkusza źródłowego: {args.source_sheet}")
         raise SystemExit(3)
 
-    ws_src: Worksheet = wb[args.source_sheet]
+    ws_src = wb_ro[args.source_sheet]
     # wybierz arkusz docelowy
-    tgt_name = _pick_target_sheet_name(wb, args.target_sheet, args.source_sheet)
-    ws_tgt: Worksheet = wb[tgt_name]
-
-    # nagłówki
-    src_header = _read_header(ws_src)
-    tgt_header = _read_header(ws_tgt)
+    tgt_name = _pick_target_sheet_name(wb_ro, args.target_sheet, args.source_sheet)
+    ws_tgt = wb_ro[tgt_name]
+
+    # nagłówek + niepuste wiersze źródła w jednym przebiegu
+    src_header: List[str] = []
+    rows_to_copy: List[tuple] = []
+    for r_idx, row in enumerate(ws_src.iter_rows(values_only=True), start=1):
+        if r_idx == 1:
+            src_header = _trim_header(row)
+            continue
+        if _row_has_data(row):
+            rows_to_copy.append(row)
+
+    # nagłówek + ostatni wypełniony wiersz docelowego w jednym przebiegu
+    tgt_header: List[str] = []
+    last_filled = 0
+    for r_idx, row in enumerate(ws_tgt.iter_rows(values_only=True), start=1):
+        if r_idx == 1:
+            tgt_header = _trim_header(row)
+        if _row_has_data(row):
+            last_filled = r_idx
+    wb_ro.close()
 
     if not src_header:
         print("[INFO] Arkusz źródłowy nie ma nagłówka lub jest pusty – nic do zrobienia.")
         raise SystemExit(0)
+    if not rows_to_copy:
+        print("[INFO] Brak danych do przeniesienia w arkuszu źródłowym.")
+        raise SystemExit(0)
+
     if not tgt_header:
-        # jeśli w docelowym nie ma nagłówka – skopiuj nagłówek źródła
-        for ci, name in enumerate(src_header, start=1):
-            ws_tgt.cell(row=1, column=ci, value=name)
         tgt_header = src_header[:]
 
     # mapowanie nagłówków po znormalizowanej nazwie
     src_map: Dict[str, int] = {_norm_header(h): i for i, h in enumerate(src_header)}  # 0-based index
     tgt_norm = [_norm_header(h) for h in tgt_header]
 
-    # policz niepuste wiersze źródła
-    max_col_src = max(len(src_header), ws_src.max_column)
-    # start danych źródłowych od 2. wiersza
-    rows_to_copy = []
-    for r in range(2, ws_src.max_row + 1):
-        if _row_has_data(ws_src, r, max_col_src):
-            # zbierz wartości w kolejności nagłówka źródła (do listy 0..len-1)
-            row_vals = [ws_src.cell(row=r, column=c).value for c in range(1, len(src_header) + 1)]
-            rows_to_copy.append(row_vals)
-
-    if not rows_to_copy:
-        print("[INFO] Brak danych do przeniesienia w arkuszu źródłowym.")
-        raise SystemExit(0)
+    # FAZA 2: właściwa modyfikacja skoroszytu (formatowanie pozostałych
+    # arkuszy musi przetrwać, więc nie ma mowy o write_only od zera)
+    try:
+        wb = load_workbook(xlsx)
+    except Exception as e:
+        print(f"[ERR] Nie mogę wczytać skoroszytu: {e}")
+        raise SystemExit(2)
 
-    # wyznacz miejsce doklejenia w docelowym
-    max_col_tgt = max(len(tgt_header), ws_tgt.max_column)
-    last_filled = _last_filled_row(ws_tgt, max_col_tgt)
-    start_row = max(last_filled + 1, 2)  # zawsze poniżej nagłówka
+    ws_src2: Worksheet = wb[args.source_sheet]
+    ws_tgt2: Worksheet = wb[tgt_name]
 
-    # wstawianie z dopasowaniem kolumn po nazwach
+    if not _trim_header([ws_tgt2.cell(row=1, column=c).value for c in range(1, len(tgt_header) + 1)]):
+        # jeśli w docelowym nie ma nagłówka – skopiuj nagłówek źródła
+        for ci, name in enumerate(tgt_header, start=1):
+            ws_tgt2.cell(row=1, column=ci, value=name)
+        last_filled = max(last_filled, 1)
+
+    # utnij pusty ogon, żeby append() doklejał tuż pod danymi
+    anchor = max(last_filled, 1)
+    if ws_tgt2.max_row > anchor:
+        ws_tgt2.delete_rows(anchor + 1, ws_tgt2.max_row - anchor)
+
+    # wstawianie z dopasowaniem kolumn po nazwach – cały wiersz jednym append;
+    # mapowanie kolumn liczymy raz, nie per wiersz
+    col_idx = [src_map.get(n) for n in tgt_norm]
     written = 0
     for rv in rows_to_copy:
-        # zmapuj: wartości w kolejności nagłówków docelowych
-        out_row = []
-        for norm_name in tgt_norm:
-            idx = src_map.get(norm_name, None)
-            out_row.append(rv[idx] if idx is not None and idx < len(rv) else "")
-        # zapisz
-        r = start_row + written
-        for c_idx, val in enumerate(out_row, start=1):
-            ws_tgt.cell(row=r, column=c_idx, value=val)
+        out_row = [rv[i] if i is not None and i < len(rv) else "" for i in col_idx]
+        ws_tgt2.append(out_row)
         written += 1
 
-    # po przeniesieniu – czyść dane w źródle (od 2. wiersza w dół), o ile nie wyłączono
+    # po przeniesieniu – czyść dane w źródle, o ile nie wyłączono;
+    # delete_rows dotyka każdej komórki, więc taniej odtworzyć arkusz
+    # z samym nagłówkiem na tej samej pozycji
     if not args.no_clear:
-        if ws_src.max_row > 1:
-            ws_src.delete_rows(2, ws_src.max_row - 1)
+        if ws_src2.max_row > 1:
+            header_vals = [c.value for c in ws_src2[1]]
+            idx = wb.sheetnames.index(args.source_sheet)
+            del wb[args.source_sheet]
+            ws_src2 = wb.create_sheet(args.source_sheet, idx)
+            ws_src2.append(header_vals)
 
     try:
         wb.save(xlsx)
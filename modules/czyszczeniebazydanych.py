@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import os
 import re
 import unicodedata
 from pathlib import Path
@@ -9,10 +10,28 @@ from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+# opcjonalne przyspieszenie normalizacji (kernele C zamiast pętli po komórkach)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+# opcjonalny strumieniowy zapis xlsx (zamiast budowania DOM-u w openpyxl)
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
 
 # ----------------------------- utils -----------------------------
 
+# wzorce kompilujemy raz – te funkcje chodzą per komórka po całych kolumnach
+_RE_SPACES    = re.compile(r"\s+")
+_RE_STREET    = re.compile(r"(?:^|[^\w])ul\.\s*([A-ZĄĆĘŁŃÓŚŹŻa-ząćęłńóśźż0-9 .\-']+)")
+_RE_SPLIT_URL = re.compile(r"[/?#]")
+_RE_DIGITS    = re.compile(r"\D")
+
 def desktop_dir() -> Path:
     return Path.home() / "Desktop"
 
@@ -42,19 +61,47 @@ def norm_text(s: object) -> Optional[str]:
         return None
     t = str(s).strip().lower()
     t = "".join(ch for ch in unicodedata.normalize("NFKD", t) if not unicodedata.combining(ch))
-    t = re.sub(r"\s+", " ", t)
+    t = _RE_SPACES.sub(" ", t)
     t = t.replace(" - ", "-").replace(".", "")
     return t or None
 
+def norm_series(s: pd.Series) -> pd.Series:
+    """
+    Wektorowy odpowiednik norm_text dla całej kolumny.
+    Usuwamy tylko znaki łączące po NFKD (jak norm_text) – 'ł' nie ma
+    dekompozycji, więc zostaje, dokładnie jak w wariancie skalarnym.
+    """
+    if pc is not None:
+        a = pa.array(s.fillna("").astype(str), type=pa.string())
+        a = pc.utf8_normalize(pc.utf8_lower(pc.utf8_trim_whitespace(a)), form="NFKD")
+        a = pc.replace_substring_regex(a, pattern=r"[\x{0300}-\x{036f}]", replacement="")
+        a = pc.replace_substring_regex(a, pattern=r"\s+", replacement=" ")
+        a = pc.replace_substring(a, pattern=" - ", replacement="-")
+        a = pc.replace_substring(a, pattern=".", replacement="")
+        # to_pandas() ma świeży RangeIndex – bierzemy gołe wartości, inaczej
+        # konstruktor Series dopasuje je po etykietach i pomiesza wiersze
+        t = pd.Series(a.to_pandas().to_numpy(), index=s.index, dtype="object")
+    else:
+        t = (s.fillna("").astype(str)
+               .str.strip().str.lower()
+               .str.normalize("NFKD")
+               .str.replace("[\u0300-\u036f]", "", regex=True)
+               .str.replace(r"\s+", " ", regex=True)
+               .str.replace(" - ", "-", regex=False)
+               .str.replace(".", "", regex=False)
+               .astype("object"))
+    return t.where(t != "", None)
+
+
 def extract_street_from_link(link: object) -> Optional[str]:
     if pd.isna(link):
         return None
     s = str(link)
-    m = re.search(r"(?:^|[^\w])ul\.\s*([A-ZĄĆĘŁŃÓŚŹŻa-ząćęłńóśźż0-9 .\-']+)", s)
+    m = _RE_STREET.search(s)
     if not m:
         return None
     street = m.group(1)
-    street = re.split(r"[/?#]", street)[0].strip()
+    street = _RE_SPLIT_URL.split(street)[0].strip()
     if not street:
         return None
     return "ul. " + street
@@ -62,7 +109,7 @@ def extract_street_from_link(link: object) -> Optional[str]:
 def digits_only(s: object) -> str:
     if pd.isna(s):
         return ""
-    return re.sub(r"\D", "", str(s))
+    return _RE_DIGITS.sub("", str(s))
 
 def clean_price_numeric(price: object, year: object) -> Optional[int]:
     d = digits_only(price)
@@ -88,6 +135,35 @@ def clean_price_numeric(price: object, year: object) -> Optional[int]:
         except Exception:
             return pd.NA
 
+def clean_price_series(price: pd.Series, year: pd.Series) -> pd.Series:
+    """Wektorowy odpowiednik clean_price_numeric dla całej kolumny."""
+    s = price.astype(str).str.replace(_RE_DIGITS, "", regex=True)
+
+    # rok jako tekst (2-cyfrowe rozszerzamy jak w wariancie skalarnym)
+    yv = pd.to_numeric(year, errors="coerce")
+    yi = np.trunc(yv.astype("float64"))
+    y_str = yi.astype("Int64").astype(str)
+    y_num = pd.to_numeric(y_str, errors="coerce")
+    two = y_str.str.len() == 2
+    y_str = pd.Series(
+        np.where(two & (y_num < 50), "20" + y_str,
+                 np.where(two, "19" + y_str, y_str)),
+        index=price.index,
+    )
+
+    # unikalnych lat jest garść – prefiks zdejmujemy grupami, nie per wiersz
+    valid = yv.notna()
+    out = s.copy()
+    for ys, idx in y_str[valid].groupby(y_str[valid]).groups.items():
+        chunk = s.loc[idx]
+        hit = chunk[chunk.str.startswith(ys)].index
+        if len(hit):
+            out.loc[hit] = s.loc[hit].str.slice(len(ys))
+
+    out = out.str.lstrip("0")
+    return pd.to_numeric(out.replace("", pd.NA), errors="coerce").astype("Int64")
+
+
 def mode1(s: pd.Series):
     s = s.dropna()
     if s.empty: return None
@@ -100,149 +176,212 @@ def unique1(s: pd.Series):
 
 # ------------------------ core filling ------------------------
 
-def fill_from_internal(df: pd.DataFrame, W: str, P: str, G: str, M: str, D: str, U: str) -> int:
-    map_m_to_w = df.dropna(subset=[M, W]).groupby(M)[W].apply(mode1).to_dict()
-    map_p_to_w = df.dropna(subset=[P, W]).groupby(P)[W].apply(mode1).to_dict()
-    map_g_to_w = df.dropna(subset=[G, W]).groupby(G)[W].apply(mode1).to_dict()
-
-    map_m_to_p = df.dropna(subset=[M, P]).groupby(M)[P].apply(mode1).to_dict()
-    map_m_to_g = df.dropna(subset=[M, G]).groupby(M)[G].apply(mode1).to_dict()
-    map_mg_to_p = df.dropna(subset=[M, G, P]).groupby([M, G])[P].apply(mode1).to_dict()
-    map_mp_to_g = df.dropna(subset=[M, P, G]).groupby([M, P])[G].apply(mode1).to_dict()
+def _mode_map(df: pd.DataFrame, keys: List[str], val: str) -> dict:
+    """Najczęstsza wartość `val` per grupa `keys`, bez apply per grupa.
+
+    Zliczamy raz i bierzemy pierwszy wiersz po stabilnym sortowaniu malejąco
+    po liczności – groupby sortuje klucze rosnąco, więc przy remisie wygrywa
+    najmniejsza wartość, tak jak w mode1 (mode() zwraca posortowane).
+    """
+    sub = df.dropna(subset=keys + [val])
+    if sub.empty:
+        return {}
+    t = (sub.groupby(keys + [val]).size().reset_index(name="_n")
+            .sort_values("_n", ascending=False, kind="stable")
+            .drop_duplicates(subset=keys))
+    if len(keys) == 1:
+        return dict(zip(t[keys[0]], t[val]))
+    return dict(zip(t[keys].itertuples(index=False, name=None), t[val]))
 
-    map_md_to_u = df.dropna(subset=[M, D, U]).groupby([M, D])[U].apply(mode1).to_dict()
-    map_m_to_d  = df.dropna(subset=[M, D]).groupby(M)[D].apply(mode1).to_dict()
+def fill_from_internal(df: pd.DataFrame, W: str, P: str, G: str, M: str, D: str, U: str) -> int:
+    map_m_to_w = _mode_map(df, [M], W)
+    map_p_to_w = _mode_map(df, [P], W)
+    map_g_to_w = _mode_map(df, [G], W)
+
+    map_m_to_p = _mode_map(df, [M], P)
+    map_m_to_g = _mode_map(df, [M], G)
+    map_mg_to_p = _mode_map(df, [M, G], P)
+    map_mp_to_g = _mode_map(df, [M, P], G)
+
+    map_md_to_u = _mode_map(df, [M, D], U)
+    map_m_to_d  = _mode_map(df, [M], D)
+
+    # kandydatów liczymy wektorowo na stanie sprzed uzupełnień (kaskadę
+    # między kolumnami daje zewnętrzna pętla zbieżności w process_inplace)
+    mg_keys = pd.MultiIndex.from_arrays([df[M], df[G]])
+    mp_keys = pd.MultiIndex.from_arrays([df[M], df[P]])
+    md_keys = pd.MultiIndex.from_arrays([df[M], df[D]])
+
+    candidates = {
+        W: df[M].map(map_m_to_w)
+               .fillna(df[P].map(map_p_to_w))
+               .fillna(df[G].map(map_g_to_w)),
+        P: df[M].map(map_m_to_p)
+               .fillna(pd.Series(mg_keys.map(map_mg_to_p.get), index=df.index)),
+        G: df[M].map(map_m_to_g)
+               .fillna(pd.Series(mp_keys.map(map_mp_to_g.get), index=df.index)),
+        D: df[M].map(map_m_to_d),
+        U: pd.Series(md_keys.map(map_md_to_u.get), index=df.index),
+    }
 
     changes = 0
-    for i, row in df.iterrows():
-        m,p,g,w,dz,u = row[M], row[P], row[G], row[W], row[D], row[U]
-        if pd.isna(w):
-            cand = None
-            if pd.notna(m) and m in map_m_to_w: cand = map_m_to_w[m]
-            elif pd.notna(p) and p in map_p_to_w: cand = map_p_to_w[p]
-            elif pd.notna(g) and g in map_g_to_w: cand = map_g_to_w[g]
-            if cand is not None:
-                df.at[i, W] = cand; changes += 1
-        if pd.isna(p):
-            cand = None
-            if pd.notna(m) and m in map_m_to_p: cand = map_m_to_p[m]
-            if cand is None and pd.notna(m) and pd.notna(g) and (m,g) in map_mg_to_p: cand = map_mg_to_p[(m,g)]
-            if cand is not None:
-                df.at[i, P] = cand; changes += 1
-        if pd.isna(g):
-            cand = None
-            if pd.notna(m) and m in map_m_to_g: cand = map_m_to_g[m]
-            if cand is None and pd.notna(m) and pd.notna(p) and (m,p) in map_mp_to_g: cand = map_mp_to_g[(m,p)]
-            if cand is not None:
-                df.at[i, G] = cand; changes += 1
-        if pd.isna(dz) and pd.notna(m) and m in map_m_to_d:
-            df.at[i, D] = map_m_to_d[m]; changes += 1
-        if pd.isna(u) and pd.notna(m) and pd.notna(dz) and (m,dz) in map_md_to_u:
-            df.at[i, U] = map_md_to_u[(m,dz)]; changes += 1
+    for col, cand in candidates.items():
+        miss = df[col].isna() & cand.notna()
+        n = int(miss.sum())
+        if n:
+            df.loc[miss, col] = cand[miss]
+            changes += n
     return changes
 
-def build_teryt_maps(teryt: pd.DataFrame, TW: Optional[str], TP: Optional[str], TG: Optional[str],
-                     TM: Optional[str], TD: Optional[str], TU: Optional[str]) -> Tuple[dict,dict,dict,dict]:
-    t = teryt.copy()
-    t["_n_TM"] = t[TM].apply(norm_text) if TM else None
-    t["_n_TD"] = t[TD].apply(norm_text) if TD else None
-    t["_n_TU"] = t[TU].apply(norm_text) if TU else None
-    t["_n_TW"] = t[TW].apply(norm_text) if TW else None
-    t["_n_TP"] = t[TP].apply(norm_text) if TP else None
-    t["_n_TG"] = t[TG].apply(norm_text) if TG else None
-
-    def agg_map(keys: List[str]):
-        grp = t.groupby(keys, dropna=False).agg(
-            TW_val=("_n_TW", mode1),
-            TP_val=("_n_TP", mode1),
-            TG_val=("_n_TG", mode1),
-            TU_one=("_n_TU", unique1),
-        ).reset_index()
-        return {tuple(row[k] for k in keys): (row.TW_val, row.TP_val, row.TG_val, row.TU_one)
-                for _, row in grp.iterrows()}
-
-    m_map  = agg_map(["_n_TM"])
-    md_map = agg_map(["_n_TM","_n_TD"])
-    mu_map = agg_map(["_n_TM","_n_TU"])
-    mdu_map= agg_map(["_n_TM","_n_TD","_n_TU"])
-    return m_map, md_map, mu_map, mdu_map
-
 def fill_from_teryt(df: pd.DataFrame, teryt: pd.DataFrame,
                     W: str, P: str, G: str, M: str, D: str, U: str,
                     TW: Optional[str], TP: Optional[str], TG: Optional[str],
                     TM: Optional[str], TD: Optional[str], TU: Optional[str]) -> int:
-    df["_n_m"] = df[M].apply(norm_text)
+    df["_n_m"] = norm_series(df[M])
     needed = set(x for x in df["_n_m"].dropna().unique())
-    t_small = teryt[teryt[TM].apply(norm_text).isin(needed)].copy() if TM else teryt.copy()
-
-    m_map, md_map, mu_map, mdu_map = build_teryt_maps(t_small, TW, TP, TG, TM, TD, TU)
-
-    df["_n_d"] = df[D].apply(norm_text)
-    df["_n_u"] = df[U].apply(norm_text)
-
-    def pick_from_maps(m, d, u):
-        order = [((m,d,u), mdu_map), ((m,u), mu_map), ((m,d), md_map), ((m,), m_map)]
-        for k, mp in order:
-            if None in k:
-                continue
-            if k in mp:
-                return mp[k]
-        return (None,None,None,None)
-
-    changes = 0
-    for i, row in df.iterrows():
-        m = row["_n_m"]; d = row["_n_d"]; u = row["_n_u"]
-        Wv, Pv, Gv, Uv = pick_from_maps(m,d,u)
-        updated = False
-        if pd.isna(row[W]) and Wv is not None:
-            df.at[i, W] = Wv; updated = True
-        if pd.isna(row[P]) and Pv is not None:
-            df.at[i, P] = Pv; updated = True
-        if pd.isna(row[G]) and Gv is not None:
-            df.at[i, G] = Gv; updated = True
-        if pd.isna(row[U]) and Uv is not None:
-            street = Uv
-            df.at[i, U] = f"ul. {street}" if street and not str(street).startswith("ul") else street
-            updated = True
-        if updated: changes += 1
+    t = teryt[norm_series(teryt[TM]).isin(needed)].copy() if TM else teryt.copy()
+
+    t["_n_TM"] = norm_series(t[TM]) if TM else None
+    t["_n_TD"] = norm_series(t[TD]) if TD else None
+    t["_n_TU"] = norm_series(t[TU]) if TU else None
+    t["_n_TW"] = norm_series(t[TW]) if TW else None
+    t["_n_TP"] = norm_series(t[TP]) if TP else None
+    t["_n_TG"] = norm_series(t[TG]) if TG else None
+
+    df["_n_d"] = norm_series(df[D])
+    df["_n_u"] = norm_series(df[U])
+
+    # kandydat per wiersz: pierwszy trafiony poziom w kolejności
+    # (m,d,u) -> (m,u) -> (m,d) -> (m,) – zamiast słowników z kluczami-krotkami
+    # jeden hash-join pandasa per poziom; trafienie (indicator) zatrzymuje
+    # spadanie na kolejne poziomy, nawet gdy zagregowane wartości są puste
+    cand_w = pd.Series([None] * len(df), index=df.index, dtype="object")
+    cand_p = cand_w.copy()
+    cand_g = cand_w.copy()
+    cand_u = cand_w.copy()
+    matched = pd.Series(False, index=df.index)
+
+    for keys, cols in ((["_n_TM", "_n_TD", "_n_TU"], ["_n_m", "_n_d", "_n_u"]),
+                       (["_n_TM", "_n_TU"], ["_n_m", "_n_u"]),
+                       (["_n_TM", "_n_TD"], ["_n_m", "_n_d"]),
+                       (["_n_TM"], ["_n_m"])):
+        rem = ~matched
+        for c in cols:
+            rem &= df[c].notna()
+        if not rem.any():
+            continue
+        grp = t.groupby(keys, dropna=False).agg(
+            _tw=("_n_TW", mode1),
+            _tp=("_n_TP", mode1),
+            _tg=("_n_TG", mode1),
+            _tu=("_n_TU", unique1),
+        ).reset_index()
+        m = (df.loc[rem, cols].reset_index()
+               .merge(grp, how="left", left_on=cols, right_on=keys, indicator=True)
+               .set_index("index"))
+        hit = m.index[m["_merge"] == "both"]
+        if len(hit):
+            cand_w[hit] = m.loc[hit, "_tw"]
+            cand_p[hit] = m.loc[hit, "_tp"]
+            cand_g[hit] = m.loc[hit, "_tg"]
+            cand_u[hit] = m.loc[hit, "_tu"]
+            matched[hit] = True
+
+    def _have(s: pd.Series) -> pd.Series:
+        # kandydaci przychodzą z merge, więc brak to NaN, nie None –
+        # oba muszą odpadać, inaczej do ulicy trafia dosłowne "ul. nan"
+        return pd.Series([v is not None and v == v for v in s], index=df.index)
+
+    mask_w = df[W].isna() & _have(cand_w)
+    mask_p = df[P].isna() & _have(cand_p)
+    mask_g = df[G].isna() & _have(cand_g)
+    mask_u = df[U].isna() & _have(cand_u)
+
+    if mask_w.any(): df.loc[mask_w, W] = cand_w[mask_w]
+    if mask_p.any(): df.loc[mask_p, P] = cand_p[mask_p]
+    if mask_g.any(): df.loc[mask_g, G] = cand_g[mask_g]
+    if mask_u.any():
+        df.loc[mask_u, U] = cand_u[mask_u].map(
+            lambda s: f"ul. {s}" if s and not str(s).startswith("ul") else s
+        )
+
+    changes = int((mask_w | mask_p | mask_g | mask_u).sum())
 
     df.drop(columns=[c for c in ["_n_m","_n_d","_n_u"] if c in df.columns], inplace=True)
     return changes
 
 # ------------------------ processing + in-place write ------------------------
 
+def _read_excel(path, **kwargs) -> pd.DataFrame:
+    """Czyta xlsx szybkim silnikiem calamine, jeśli jest zainstalowany."""
+    try:
+        return pd.read_excel(path, engine="calamine", **kwargs)
+    except (ImportError, ValueError):
+        return pd.read_excel(path, engine="openpyxl", **kwargs)
+
 def find_source_sheet(xlsx: Path) -> str:
-    xl = pd.ExcelFile(xlsx, engine="openpyxl")
-    for nm in xl.sheet_names:
-        tmp = xl.parse(nm, nrows=1)
-        if "Nr KW" in tmp.columns:
-            return nm
-    return xl.sheet_names[0]
+    # read_only nie buduje DOM-u całego skoroszytu – do zajrzenia
+    # w pierwszy wiersz każdego arkusza to tania, strumieniowa ścieżka
+    wb = load_workbook(xlsx, read_only=True, data_only=True)
+    try:
+        names = wb.sheetnames
+        for nm in names:
+            row1 = next(wb[nm].iter_rows(min_row=1, max_row=1, values_only=True), ())
+            if "Nr KW" in row1:
+                return nm
+        return names[0]
+    finally:
+        wb.close()
+
+def _df_to_object_rows(df: pd.DataFrame) -> np.ndarray:
+    """Jedna tablica object z None zamiast NA/±inf.
+
+    Zastępuje łańcuch replace → copy → astype(object) → maska NA, z którego
+    każdy krok alokował kopię całej ramki (openpyxl akceptuje None, ale
+    nie <NA> ani nieskończoności).
+    """
+    arr = df.to_numpy(dtype=object, copy=True)
+    if arr.size:
+        # najpierw NA → None (porównanie <NA> == inf dałoby znowu <NA>),
+        # dopiero potem nieskończoności
+        arr[pd.isna(arr)] = None
+        arr[(arr == np.inf) | (arr == -np.inf)] = None
+    return arr
 
 def write_df_inplace_no_new_sheets(xlsx: Path, sheet_name: str, df: pd.DataFrame) -> None:
     """Nadpisuje TYLKO istniejący arkusz, bez tworzenia nowych."""
+    header = [str(c) for c in df.columns]
+    arr = _df_to_object_rows(df)
+
+    # szybka ścieżka: jeśli plik ma tylko ten jeden arkusz, nie ma czego
+    # chronić – piszemy świeży skoroszyt strumieniowo (xlsxwriter,
+    # constant_memory, wiersze w kolejności) i podmieniamy plik atomowo
+    # zamiast budować DOM w openpyxl
+    wb_ro = load_workbook(xlsx, read_only=True)
+    names = wb_ro.sheetnames
+    wb_ro.close()
+    if xlsxwriter is not None and len(names) == 1:
+        target = sheet_name if sheet_name in names else names[0]
+        tmp = xlsx.with_suffix(".tmp.xlsx")
+        with xlsxwriter.Workbook(str(tmp), {"constant_memory": True}) as wbx:
+            ws = wbx.add_worksheet(target)
+            ws.write_row(0, 0, header)
+            for r in range(arr.shape[0]):
+                ws.write_row(r + 1, 0, arr[r].tolist())
+        os.replace(tmp, xlsx)
+        return
+
     wb = load_workbook(xlsx)
     if sheet_name in wb.sheetnames:
         ws = wb[sheet_name]
     else:
         ws = wb[wb.sheetnames[0]]
 
-    # wyczyść arkusz
+    # wyczyść arkusz, potem nagłówek + dane
     ws.delete_rows(1, ws.max_row)
-
-    # --- KLUCZ 1: usuń nieskończoności ---
-    df_to_write = df.replace([np.inf, -np.inf], np.nan).copy()
-
-    # --- KLUCZ 2: zbij dtype'y do object (żeby móc wstawić None zamiast <NA>) ---
-    df_to_write = df_to_write.astype(object)
-
-    # --- KLUCZ 3: zamień każde NA/NaN na None (openpyxl akceptuje None, ale nie <NA>) ---
-    na_mask = pd.isna(df_to_write)
-    df_to_write[na_mask] = None
-
-    # nagłówki + dane
-    for row in dataframe_to_rows(df_to_write, index=False, header=True):
-        ws.append(row)
+    ws.append(header)
+    for r in range(arr.shape[0]):
+        ws.append(arr[r].tolist())
 
     wb.save(xlsx)
 
@@ -251,7 +390,7 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
         raise FileNotFoundError(f"Nie znaleziono pliku wejściowego: {input_path}")
 
     sheet = find_source_sheet(input_path)
-    df = pd.read_excel(input_path, sheet_name=sheet, engine="openpyxl")
+    df = _read_excel(input_path, sheet_name=sheet)
 
     # wymagane kolumny + mapowanie
     cmap = ensure_columns(df, [
@@ -262,9 +401,16 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
     W, P, G, M, D, U, LNK = (cmap["wojewodztwo"], cmap["powiat"], cmap["gmina"],
                               cmap["miejscowosc"], cmap["dzielnica"], cmap["ulica"], cmap["link"])
 
-    # Tekstowe → object
+    # Tekstowe → string[pyarrow] gdy dostępny (ułamek RAM-u kolumny object,
+    # a operacje .str/merge schodzą do kerneli Arrow); kolumny z wartościami
+    # nietekstowymi (i brak pyarrow) zostają na object, żeby liczb nie
+    # zamieniać po cichu na napisy
     for c in [W, P, G, M, D, U, LNK]:
-        if c in df.columns:
+        if c not in df.columns:
+            continue
+        if pa is not None and pd.api.types.infer_dtype(df[c], skipna=True) in ("string", "empty"):
+            df[c] = df[c].astype("string[pyarrow]")
+        else:
             df[c] = df[c].astype("object")
 
     # Liczbowe → numeric
@@ -272,12 +418,8 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    # 1) czyszczenie ceny → liczba
-    df[CENA] = [clean_price_numeric(val, yr) for val, yr in zip(df[CENA], df[ROK])]
-    try:
-        df[CENA] = df[CENA].astype("Int64")
-    except Exception:
-        df[CENA] = pd.to_numeric(df[CENA], errors="coerce")
+    # 1) czyszczenie ceny → liczba (wektorowo, bez pętli po komórkach)
+    df[CENA] = clean_price_series(df[CENA], df[ROK])
 
     # 2) cena za m2 (float) — metry mogą być 0/NaN → zabezpiecz inf
     cena_num  = pd.to_numeric(df[CENA], errors="coerce")
@@ -286,9 +428,14 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
     cena_za_m = cena_za_m.replace([np.inf, -np.inf], np.nan)
     df[CENAM2] = cena_za_m.round(2)
 
-    # 3) ulica z linku (dla braków)
+    # 3) ulica z linku (dla braków) – regex raz na całą kolumnę zamiast per wiersz
     miss_u = df[U].isna()
-    df.loc[miss_u, U] = df.loc[miss_u, LNK].apply(extract_street_from_link)
+    streets = (df.loc[miss_u, LNK].astype("string")
+                 .str.extract(_RE_STREET, expand=False)
+                 .str.split(_RE_SPLIT_URL, n=1, regex=True).str[0]
+                 .str.strip())
+    streets = "ul. " + streets.where(streets != "", pd.NA)
+    df.loc[miss_u, U] = streets.astype(object).where(streets.notna(), None)
 
     # 4) fill z własnych danych
     for _ in range(3):
@@ -298,7 +445,7 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
 
     # 5) fill z TERYT (opcjonalnie)
     if teryt_path and teryt_path.exists():
-        teryt = pd.read_excel(teryt_path, engine="openpyxl")
+        teryt = _read_excel(teryt_path)
         tmap = norm_colnames(teryt.columns)
         aliases = {
             "wojewodztwo": ["wojewodztwo","woj","nazwa_woj","nazwa województwa","województwo"],
@@ -315,8 +462,8 @@ def process_inplace(input_path: Path, teryt_path: Optional[Path]) -> None:
         TW = pick(aliases["wojewodztwo"]); TP = pick(aliases["powiat"]); TG = pick(aliases["gmina"])
         TM = pick(aliases["miejscowosc"]); TD = pick(aliases["dzielnica"]); TU = pick(aliases["ulica"])
 
-        teryt["_n_TM_tmp"] = teryt[TM].apply(norm_text) if TM else None
-        needed = set(x for x in df[M].apply(norm_text).dropna().unique())
+        teryt["_n_TM_tmp"] = norm_series(teryt[TM]) if TM else None
+        needed = set(x for x in norm_series(df[M]).dropna().unique())
         t_small = teryt[teryt["_n_TM_tmp"].isin(needed)].drop(columns=["_n_TM_tmp"])
         fill_from_teryt(df, t_small, W, P, G, M, D, U, TW, TP, TG, TM, TD, TU)
 
@@ -5,23 +5,30 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 import pandas as pd
+from openpyxl import load_workbook
 
 SHEET_RAPORT = "raport"
 SHEET_ODF = "raport_odfiltrowane"
 COL_UDZ = "Czy udziały?"
 
-def _load_or_first(xlsx: Path) -> str:
-    xl = pd.ExcelFile(xlsx, engine="openpyxl")
-    return SHEET_RAPORT if SHEET_RAPORT in xl.sheet_names else xl.sheet_names[0]
+def _sheet_to_df(ws) -> pd.DataFrame:
+    """Zrzuca arkusz do DataFrame jednym przebiegiem iter_rows (bez obiektów Cell)."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    cols = [str(h) if h is not None else "" for h in header]
+    return pd.DataFrame(rows, columns=cols)
 
-def _ensure_odf(xlsx: Path, header_cols: list[str]):
-    # jeśli brak – zapisz pusty z samym nagłówkiem
-    try:
-        pd.read_excel(xlsx, sheet_name=SHEET_ODF, engine="openpyxl")
-    except Exception:
-        df0 = pd.DataFrame(columns=header_cols)
-        with pd.ExcelWriter(xlsx, engine="openpyxl", mode="a", if_sheet_exists="replace") as wr:
-            df0.to_excel(wr, sheet_name=SHEET_ODF, index=False)
+def _write_df(ws, df: pd.DataFrame) -> None:
+    """Nadpisuje arkusz zawartością DataFrame (NA → None, bo openpyxl nie zna <NA>)."""
+    if ws.max_row:
+        ws.delete_rows(1, ws.max_row)
+    out = df.astype(object)
+    out[pd.isna(out)] = None
+    ws.append(list(out.columns))
+    for row in out.itertuples(index=False, name=None):
+        ws.append(row)
 
 def main():
     xlsx = Path(sys.argv[sys.argv.index("--in")+1]).expanduser() if "--in" in sys.argv else None
@@ -29,8 +36,11 @@ def main():
         print("[ERR] Podaj: --in <plik.xlsx>")
         sys.exit(1)
 
-    src_sheet = _load_or_first(xlsx)
-    df = pd.read_excel(xlsx, sheet_name=src_sheet, engine="openpyxl")
+    # jeden load_workbook zamiast trzech odczytów przez pandas
+    # (mode="a" u openpyxl i tak wczytuje cały skoroszyt do pamięci)
+    wb = load_workbook(xlsx)
+    src_sheet = SHEET_RAPORT if SHEET_RAPORT in wb.sheetnames else wb.sheetnames[0]
+    df = _sheet_to_df(wb[src_sheet])
     if COL_UDZ not in df.columns:
         print(f"[ERR] Brak kolumny: {COL_UDZ}")
         sys.exit(2)
@@ -40,19 +50,21 @@ def main():
     to_move = df[mask_move].copy()
     stay = df[~mask_move].copy()
 
-    _ensure_odf(xlsx, list(df.columns))
-    try:
-        df_odf = pd.read_excel(xlsx, sheet_name=SHEET_ODF, engine="openpyxl")
-    except Exception:
+    if SHEET_ODF in wb.sheetnames:
+        df_odf = _sheet_to_df(wb[SHEET_ODF])
+        if df_odf.columns.empty:
+            df_odf = pd.DataFrame(columns=df.columns)
+    else:
+        wb.create_sheet(SHEET_ODF)
         df_odf = pd.DataFrame(columns=df.columns)
 
     # ujednolić kolumny
     to_move = to_move.reindex(columns=df_odf.columns, fill_value="")
 
     new_odf = pd.concat([df_odf, to_move], ignore_index=True)
-    with pd.ExcelWriter(xlsx, engine="openpyxl", mode="a", if_sheet_exists="replace") as wr:
-        stay.to_excel(wr, sheet_name=src_sheet, index=False)
-        new_odf.to_excel(wr, sheet_name=SHEET_ODF, index=False)
+    _write_df(wb[src_sheet], stay)
+    _write_df(wb[SHEET_ODF], new_odf)
+    wb.save(xlsx)
 
     print(f"[OK] Przerzucono: {len(to_move)}  |  Pozostało w '{src_sheet}': {len(stay)}")
 
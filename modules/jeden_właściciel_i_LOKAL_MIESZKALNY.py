@@ -4,30 +4,44 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 import pandas as pd
-import re
-import unicodedata
+from openpyxl import load_workbook
 
 SHEET_RAPORT = "raport"
 SHEET_ODF = "raport_odfiltrowane"
 COL_PRZ = "Przeznaczenie (dla lokalu)"
 COL_UDZ = "Czy udziały?"
 
-def _norm(s: str) -> str:
-    s = "".join(ch for ch in unicodedata.normalize("NFD", str(s or "")) if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"\s+", " ", s).strip().lower()
-    return s
+def _norm_eq_series(s: pd.Series, const: str) -> pd.Series:
+    """Wektorowe `_norm(v) == const` – bez pętli unicodedata per komórka.
 
-def _load_or_first(xlsx: Path) -> str:
-    xl = pd.ExcelFile(xlsx, engine="openpyxl")
-    return SHEET_RAPORT if SHEET_RAPORT in xl.sheet_names else xl.sheet_names[0]
+    NFD + zdjęcie znaków łączących robi pandas na całej kolumnie; "ł" nie
+    ma dekompozycji, więc zostaje – dokładnie jak w wariancie skalarnym.
+    """
+    t = (s.fillna("").astype(str)
+           .str.normalize("NFD")
+           .str.replace("[\u0300-\u036f]", "", regex=True)
+           .str.replace(r"\s+", " ", regex=True)
+           .str.strip().str.lower())
+    return t.eq(const)
 
-def _ensure_odf(xlsx: Path, header_cols: list[str]):
-    try:
-        pd.read_excel(xlsx, sheet_name=SHEET_ODF, engine="openpyxl")
-    except Exception:
-        df0 = pd.DataFrame(columns=header_cols)
-        with pd.ExcelWriter(xlsx, engine="openpyxl", mode="a", if_sheet_exists="replace") as wr:
-            df0.to_excel(wr, sheet_name=SHEET_ODF, index=False)
+def _sheet_to_df(ws) -> pd.DataFrame:
+    """Zrzuca arkusz do DataFrame jednym przebiegiem iter_rows (bez obiektów Cell)."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    cols = [str(h) if h is not None else "" for h in header]
+    return pd.DataFrame(rows, columns=cols)
+
+def _write_df(ws, df: pd.DataFrame) -> None:
+    """Nadpisuje arkusz zawartością DataFrame (NA → None, bo openpyxl nie zna <NA>)."""
+    if ws.max_row:
+        ws.delete_rows(1, ws.max_row)
+    out = df.astype(object)
+    out[pd.isna(out)] = None
+    ws.append(list(out.columns))
+    for row in out.itertuples(index=False, name=None):
+        ws.append(row)
 
 def main():
     xlsx = Path(sys.argv[sys.argv.index("--in")+1]).expanduser() if "--in" in sys.argv else None
@@ -35,8 +49,11 @@ def main():
         print("[ERR] Podaj: --in <plik.xlsx>")
         sys.exit(1)
 
-    src_sheet = _load_or_first(xlsx)
-    df = pd.read_excel(xlsx, sheet_name=src_sheet, engine="openpyxl")
+    # jeden load_workbook zamiast trzech odczytów przez pandas
+    # (mode="a" u openpyxl i tak wczytuje cały skoroszyt do pamięci)
+    wb = load_workbook(xlsx)
+    src_sheet = SHEET_RAPORT if SHEET_RAPORT in wb.sheetnames else wb.sheetnames[0]
+    df = _sheet_to_df(wb[src_sheet])
 
     need = [COL_PRZ, COL_UDZ]
     missing = [c for c in need if c not in df.columns]
@@ -44,25 +61,27 @@ def main():
         print(f"[ERR] Brak kolumn: {', '.join(missing)}")
         sys.exit(2)
 
-    mask_prz_ok = df[COL_PRZ].apply(lambda v: _norm(v) == "lokal mieszkalny")
+    mask_prz_ok = _norm_eq_series(df[COL_PRZ], "lokal mieszkalny")
     mask_udz_ok = df[COL_UDZ].astype(str).str.contains(r"\bnie\b", case=False, na=False, regex=True)
 
     mask_keep = mask_prz_ok & mask_udz_ok
     stay = df[mask_keep].copy()
     to_move = df[~mask_keep].copy()
 
-    _ensure_odf(xlsx, list(df.columns))
-    try:
-        df_odf = pd.read_excel(xlsx, sheet_name=SHEET_ODF, engine="openpyxl")
-    except Exception:
+    if SHEET_ODF in wb.sheetnames:
+        df_odf = _sheet_to_df(wb[SHEET_ODF])
+        if df_odf.columns.empty:
+            df_odf = pd.DataFrame(columns=df.columns)
+    else:
+        wb.create_sheet(SHEET_ODF)
         df_odf = pd.DataFrame(columns=df.columns)
 
     to_move = to_move.reindex(columns=df_odf.columns, fill_value="")
     new_odf = pd.concat([df_odf, to_move], ignore_index=True)
 
-    with pd.ExcelWriter(xlsx, engine="openpyxl", mode="a", if_sheet_exists="replace") as wr:
-        stay.to_excel(wr, sheet_name=src_sheet, index=False)
-        new_odf.to_excel(wr, sheet_name=SHEET_ODF, index=False)
+    _write_df(wb[src_sheet], stay)
+    _write_df(wb[SHEET_ODF], new_odf)
+    wb.save(xlsx)
 
     print(f"[OK] Przerzucono: {len(to_move)} | Pozostało w '{src_sheet}': {len(stay)}")
 
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+import re
 import sys
 import csv
+import zipfile
 import argparse
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from openpyxl import Workbook, load_workbook
@@ -111,6 +117,166 @@ def create_voivodeship_csvs(base: Path) -> dict:
 # ---------------------------------------------------------
 
 # ----------------- dopisywanie kolumn w raporcie -----------------
+# .xlsx to ZIP z XML-em w środku; do dopisania kilku komórek nagłówka nie
+# trzeba budować całego skoroszytu w pamięci (openpyxl parsuje każdy arkusz,
+# styl i shared string). Łatamy tylko pierwszy <row> właściwego arkusza,
+# resztę wpisów ZIP-a kopiujemy bajt w bajt.
+
+_SSML = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_RELNS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _col_letter(idx: int) -> str:
+    """1 → 'A', 27 → 'AA'."""
+    out = ""
+    while idx:
+        idx, r = divmod(idx - 1, 26)
+        out = chr(65 + r) + out
+    return out
+
+
+def _ref_col(ref: str) -> int:
+    """'AB12' → 28 (numer kolumny z adresu komórki)."""
+    n = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        n = n * 26 + (ord(ch.upper()) - 64)
+    return n
+
+
+def _find_sheet_path(zin: zipfile.ZipFile) -> Optional[str]:
+    """Ścieżka XML-a arkusza 'raport' (albo pierwszego) wg workbook.xml + rels."""
+    wb_xml = ET.fromstring(zin.read("xl/workbook.xml"))
+    sheets = wb_xml.findall(f"{{{_SSML}}}sheets/{{{_SSML}}}sheet")
+    if not sheets:
+        return None
+    chosen = next((s for s in sheets if s.get("name") == RAPORT_SHEET), sheets[0])
+    rid = chosen.get(f"{{{_RELNS}}}id")
+    rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels:
+        if rel.get("Id") == rid:
+            target = rel.get("Target") or ""
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return "xl/" + target
+    return None
+
+
+def _shared_strings(zin: zipfile.ZipFile, needed: set) -> Dict[int, str]:
+    """Teksty z sharedStrings.xml tylko dla potrzebnych indeksów (iterparse
+    z wczesnym wyjściem – nie czytamy całej tablicy stringów raportu)."""
+    if not needed or "xl/sharedStrings.xml" not in zin.namelist():
+        return {}
+    last = max(needed)
+    out: Dict[int, str] = {}
+    idx = -1
+    for _ev, el in ET.iterparse(io.BytesIO(zin.read("xl/sharedStrings.xml"))):
+        if el.tag == f"{{{_SSML}}}si":
+            idx += 1
+            if idx in needed:
+                out[idx] = "".join(t.text or "" for t in el.iter(f"{{{_SSML}}}t"))
+            el.clear()
+            if idx >= last:
+                break
+    return out
+
+
+def _row1_headers(row_el: ET.Element, strings: Dict[int, str]) -> tuple[List[str], int]:
+    """Nagłówki i numer ostatniej zajętej kolumny z elementu pierwszego wiersza."""
+    headers: List[str] = []
+    max_col = 0
+    for c in row_el.findall(f"{{{_SSML}}}c"):
+        col = _ref_col(c.get("r") or "")
+        max_col = max(max_col, col)
+        t = c.get("t")
+        if t == "s":
+            v = c.find(f"{{{_SSML}}}v")
+            val = strings.get(int(v.text), "") if v is not None and v.text else ""
+        elif t == "inlineStr":
+            val = "".join(t_el.text or "" for t_el in c.iter(f"{{{_SSML}}}t"))
+        else:
+            v = c.find(f"{{{_SSML}}}v")
+            val = v.text if v is not None and v.text is not None else ""
+        headers.append(str(val))
+    return headers, max_col
+
+
+def _patch_header_zip(xlsx: Path, target_cols: List[str]) -> bool:
+    """
+    Szybka ścieżka: dopisuje brakujące nagłówki edytując wyłącznie XML
+    jednego arkusza wewnątrz ZIP-a. Zwraca False, gdy plik odbiega od
+    oczekiwanej struktury – wtedy wołający spada na openpyxl.
+    """
+    with zipfile.ZipFile(xlsx) as zin:
+        sheet_path = _find_sheet_path(zin)
+        if sheet_path is None or sheet_path not in zin.namelist():
+            return False
+        data = zin.read(sheet_path)
+
+        # pierwszy wiersz – pusty arkusz zostawiamy ścieżce openpyxl
+        m = re.search(rb'<row[^>]*\br="1"[^>]*>', data)
+        if m is None or m.group(0).endswith(b"/>"):
+            return False
+        end = data.find(b"</row>", m.end())
+        if end < 0:
+            return False
+
+        row_el = ET.fromstring(
+            b'<r xmlns="' + _SSML.encode() + b'">' + data[m.start():end + 6] + b"</r>"
+        )[0]
+        needed = {
+            int(v.text)
+            for c in row_el.findall(f"{{{_SSML}}}c")
+            if c.get("t") == "s"
+            for v in c.findall(f"{{{_SSML}}}v")
+            if v.text
+        }
+        headers, max_col = _row1_headers(row_el, _shared_strings(zin, needed))
+
+        missing = [n for n in target_cols if n not in headers]
+        if not missing:
+            return True  # nic do dopisania – nie przepisujemy pliku
+
+        # nowe komórki jako inlineStr – bez dotykania sharedStrings.xml
+        cells = "".join(
+            f'<c r="{_col_letter(max_col + i)}1" t="inlineStr">'
+            f"<is><t>{escape(name)}</t></is></c>"
+            for i, name in enumerate(missing, start=1)
+        ).encode("utf-8")
+        patched = data[:end] + cells + data[end:]
+
+        # zszarzały spans w wierszu 1 poprawiamy pod nową szerokość
+        open_tag = patched[m.start():m.end()]
+        new_tag = re.sub(
+            rb'spans="(\d+):\d+"',
+            b'spans="\\g<1>:%d"' % (max_col + len(missing)),
+            open_tag,
+        )
+        if new_tag != open_tag:
+            patched = patched[:m.start()] + new_tag + patched[m.start() + len(open_tag):]
+
+        # <dimension> też musi objąć nowe kolumny: openpyxl w trybie
+        # read_only ufa mu i obcinałby wiersz 1 na starej szerokości
+        dm = re.search(rb'<dimension ref="([^"]+)"[^>]*/?>', patched)
+        if dm is not None:
+            ref = dm.group(1).decode("ascii")
+            start_ref = ref.split(":")[0]
+            end_ref = ref.split(":")[-1]
+            end_row = "".join(ch for ch in end_ref if ch.isdigit()) or "1"
+            end_col = max(_ref_col(end_ref), max_col + len(missing))
+            new_dim = f'<dimension ref="{start_ref}:{_col_letter(end_col)}{end_row}"/>'
+            patched = patched[:dm.start()] + new_dim.encode("ascii") + patched[dm.end():]
+
+        tmp = xlsx.with_suffix(xlsx.suffix + ".tmp")
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                payload = patched if info.filename == sheet_path else zin.read(info.filename)
+                zout.writestr(info, payload)
+    os.replace(tmp, xlsx)
+    return True
+
+
 def ensure_report_columns(xlsx: Path) -> None:
     """
     Dopisuje do pliku Excela (raport) brakujące kolumny z REQ_COLS i VALUE_COLS.
@@ -122,6 +288,15 @@ def ensure_report_columns(xlsx: Path) -> None:
     if xlsx.suffix.lower() not in SUPPORTED:
         raise ValueError(f"Obsługiwane tylko pliki Excel: {SUPPORTED} (podano: {xlsx.suffix})")
 
+    # lista kolumn do upewnienia się
+    target_cols = REQ_COLS + VALUE_COLS
+
+    try:
+        if _patch_header_zip(xlsx, target_cols):
+            return
+    except Exception:
+        pass  # nietypowy plik – openpyxl poniżej poradzi sobie wolniej, ale pewnie
+
     wb = load_workbook(xlsx)
     if RAPORT_SHEET in wb.sheetnames:
         ws = wb[RAPORT_SHEET]
@@ -134,9 +309,6 @@ def ensure_report_columns(xlsx: Path) -> None:
         val = cell.value
         headers.append("" if val is None else str(val))
 
-    # lista kolumn do upewnienia się
-    target_cols = REQ_COLS + VALUE_COLS
-
     for name in target_cols:
         if name not in headers:
             col_idx = len(headers) + 1  # kolejna wolna kolumna
@@ -26,8 +26,32 @@ from urllib.parse import urljoin, urlsplit, urlunsplit
 import requests
 from bs4 import BeautifulSoup
 
+try:
+    # lxml parsuje w C i oddaje atrybuty bez budowania drzewa bs4 –
+    # na ~100 stronach na region to jest gorąca ścieżka
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+if lxml_html is not None:
+    # XPath skompilowane raz, nie per strona
+    _XPATH_TILES = etree.XPath('//a[@data-cy="listing-item-link"]/@href')
+    _XPATH_OFFERS = etree.XPath('//a[contains(@href, "/pl/oferta/")]/@href')
+
 UA = "Chrome/127.0.0.0"
 
+# wzorce kompilowane raz na import – _DIGITS_RE lata w _int per baner,
+# pozostałe trzymamy obok dla spójności
+_DIGITS_RE = re.compile(r"\D")
+_SPACES_RE = re.compile(r"\s+")
+_WORDDASH_RE = re.compile(r"(?<=\w)-(?=\w)")
+_NONSLUG_RE = re.compile(r"[^a-z0-9\-]+")
+_MULTIDASH_RE = re.compile(r"-{3,}")
+
+# polskie diakrytyki jedną tablicą translate (jedno przejście w C);
+# istotne też dla 'ł', które nie ma rozkładu NFKD i ginęło przy filtrze
+_PL_MAP = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+
 
 def LOG(msg: str) -> None:
     print(msg, flush=True)
@@ -42,17 +66,18 @@ def normalize_region_slug(name: str) -> str:
       - KAŻDY pojedynczy '-' między znakami słowa -> '--' (np. 'warminsko-mazurskie' -> 'warminsko--mazurskie')
       - tylko [a-z0-9-], bez znaków specjalnych
     """
-    s = (name or "").strip().lower()
-    # usuń diakrytyki
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    s = (name or "").strip().lower().translate(_PL_MAP)
+    if not s.isascii():
+        # znaki spoza polskiego zestawu – pełne NFKD w odwodzie
+        s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
     # spacje -> '--'
-    s = re.sub(r"\s+", "--", s)
+    s = _SPACES_RE.sub("--", s)
     # pojedynczy '-' pomiędzy znakami słowa -> '--'
-    s = re.sub(r"(?<=\w)-(?=\w)", "--", s)
+    s = _WORDDASH_RE.sub("--", s)
     # dopuszczalne: litery, cyfry, '-'
-    s = re.sub(r"[^a-z0-9\-]+", "", s)
+    s = _NONSLUG_RE.sub("", s)
     # zredukuj 3+ minusy do dokładnie dwóch
-    s = re.sub(r"-{3,}", "--", s)
+    s = _MULTIDASH_RE.sub("--", s)
     return s.strip("-")
 
 
@@ -87,7 +112,7 @@ _BANNER_RE = re.compile(
 
 
 def _int(s: str) -> int:
-    return int(re.sub(r"\D", "", s)) if s else 0
+    return int(_DIGITS_RE.sub("", s)) if s else 0
 
 
 def parse_banner_counts(html: str) -> tuple[int, int, int] | None:
@@ -121,29 +146,42 @@ def clean_url(u: str, base: str = "https://www.otodom.pl") -> str:
     return urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip("/"), "", ""))
 
 
-def extract_links(html: str) -> List[str]:
+def _hrefs_from_html(html: str) -> List[str]:
     """
-    Główna metoda: DOM — selektor 'a[data-cy="listing-item-link"]'.
-    Fallback: 'a[href*="/pl/oferta/"]'
+    Surowe href-y kafelków: najpierw selektor 'a[data-cy="listing-item-link"]',
+    fallback 'a[href*="/pl/oferta/"]' gdyby data-cy się zmieniło.
+    Parsuje lxml-em, jeśli jest; bs4 zostaje jako zapas.
     """
+    if lxml_html is not None:
+        try:
+            tree = lxml_html.fromstring(html)
+        except Exception:
+            pass  # uszkodzony dokument – niech spróbuje bs4
+        else:
+            return list(_XPATH_TILES(tree)) or list(_XPATH_OFFERS(tree))
+
     sp = soup_of(html)
+    anchors = sp.select('a[data-cy="listing-item-link"]') or sp.select('a[href*="/pl/oferta/"]')
+    return [a.get("href", "") for a in anchors]
+
+
+def extract_links(html: str) -> List[str]:
+    """
+    Znormalizowane, unikalne linki ofert ze strony wyników (kolejność DOM).
+    """
     links: list[str] = []
+    seen: Set[str] = set()       # znormalizowane linki już na liście
+    seen_href: Set[str] = set()  # surowe href-y – nie czyścimy dwa razy tego samego
 
-    # wariant podstawowy
-    for a in sp.select('a[data-cy="listing-item-link"]'):
-        href = a.get("href", "")
+    for href in _hrefs_from_html(html):
+        if not href or href in seen_href:
+            continue
+        seen_href.add(href)
         u = clean_url(href)
-        if u:
+        if u and u not in seen:
+            seen.add(u)
             links.append(u)
 
-    # fallback, gdyby data-cy się zmieniło
-    if not links:
-        for a in sp.select('a[href*="/pl/oferta/"]'):
-            href = a.get("href", "")
-            u = clean_url(href)
-            if u:
-                links.append(u)
-
     return links
 
 
@@ -209,13 +247,18 @@ def main():
         max_pages = min(max_pages, args.max_pages)
         LOG(f"[limit] max_pages ograniczone do {max_pages}")
 
-    # Zbiór linków
+    # Zbiór linków: lista trzyma kolejność, set daje test przynależności O(1)
+    # przez cały crawl – bez przebudowywania zbioru na każdej stronie
     all_links: List[str] = []
+    seen: Set[str] = set()
+
     # Strona 1
     links1 = extract_links(html1)
-    LOG(f"[page 1] dom={len(links1)} new={len(unique(links1))} total_unique={len(unique(links1))}")
-    all_links.extend(links1)
-    all_links = unique(all_links)
+    for u in links1:
+        if u not in seen:
+            seen.add(u)
+            all_links.append(u)
+    LOG(f"[page 1] dom={len(links1)} new={len(all_links)} total_unique={len(all_links)}")
     LOG(f"[unique after p1] {len(all_links)}")
 
     # Następne strony
@@ -223,14 +266,12 @@ def main():
         urlp = page_url(region_slug, p, args.per_page)
         html = fetch(sess, urlp)
         links = extract_links(html)
-        before = len(all_links)
         # ile nowych?
         new_cnt = 0
-        seen_set = set(all_links)
         for u in links:
-            if u and u not in seen_set:
+            if u not in seen:
+                seen.add(u)
                 all_links.append(u)
-                seen_set.add(u)
                 new_cnt += 1
         LOG(f"[page {p}] dom={len(links)} new={new_cnt} total_unique={len(all_links)}")
         if args.delay > 0:
@@ -240,9 +281,8 @@ def main():
     # Zapis CSV
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     with out_csv.open("w", encoding="utf-8-sig", newline="") as f:
-        f.write("link\n")
-        for u in all_links:
-            f.write(u + "\n")
+        # jeden bufor i jeden write zamiast wywołania na wiersz
+        f.write("link\n" + "".join(u + "\n" for u in all_links))
 
     LOG(f"[done] zapisano: {out_csv} (unikalnych linków: {len(all_links)})")
 
@@ -3,13 +3,15 @@
 
 import sys
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 import traceback
 
 def run_scraper_inside_process(in_file: Path, out_file: Path, delay_min: float, delay_max: float, retries: int, log_file):
     """
-    Uruchamia scraper_otodom_mieszkania w TYM SAMYM procesie,
+    Uruchamia scraper_otodom_mieszkania w procesie wołającego,
     przekazując parametry przez sys.argv i wywołując scraper.main().
     """
     # Import lokalny — dzięki temu PyInstaller dołączy moduł
@@ -46,6 +48,24 @@ def run_scraper_inside_process(in_file: Path, out_file: Path, delay_min: float,
         sys.argv = old_argv
 
 
+def _run_one(in_file: Path, out_file: Path, delay_min: float, delay_max: float,
+             retries: int, log_path: Path) -> str:
+    """
+    Zadanie dla workera: jedno województwo, własny log (wspólny plik logu
+    między procesami gryzłby się przy zapisie).
+    """
+    with open(log_path, "a", encoding="utf-8") as log:
+        run_scraper_inside_process(
+            in_file=in_file,
+            out_file=out_file,
+            delay_min=delay_min,
+            delay_max=delay_max,
+            retries=retries,
+            log_file=log,
+        )
+    return in_file.name
+
+
 def main():
     ap = argparse.ArgumentParser(
         description="PriceBot Launcher — przechodzi po wszystkich plikach CSV w linki/ "
@@ -60,6 +80,7 @@ def main():
     ap.add_argument("--delay-min", dest="delay_min", type=float, default=4.0, help="Minimalne opóźnienie (sek).")
     ap.add_argument("--delay-max", dest="delay_max", type=float, default=6.0, help="Maksymalne opóźnienie (sek).")
     ap.add_argument("--retries", type=int, default=3, help="Liczba prób pobrania jednego ogłoszenia.")
+    ap.add_argument("--workers", type=int, default=8, help="Ile województw scrapować równolegle.")
     ap.add_argument(
         "--only",
         default="*.csv",
@@ -93,19 +114,33 @@ def main():
             print(f"[WARN] Nic do zrobienia. Log: {log_path}")
             return 0
 
-        for in_file in csvs:
-            out_file = woj_dir / in_file.name
-            print("\n[run]", in_file.name, "->", out_file.name, file=log)
-
-            # Uruchom scraper w tym samym procesie (bez subprocess)
-            run_scraper_inside_process(
-                in_file=in_file,
-                out_file=out_file,
-                delay_min=args.delay_min,
-                delay_max=args.delay_max,
-                retries=args.retries,
-                log_file=log
-            )
+        # Województwa są od siebie niezależne, a scraper i tak głównie czeka
+        # na sieć i sleep-y – równoległe procesy nakładają te czekania na
+        # siebie. Opóźnienia per request zostają, więc zdalny serwer widzi
+        # ten sam rytm zapytań na region co przy przebiegu sekwencyjnym.
+        max_workers = max(1, min(args.workers, len(csvs)))
+        print(f"[i] workers={max_workers}", file=log)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            futs = {}
+            for in_file in csvs:
+                out_file = woj_dir / in_file.name
+                region_log = logs_dir / f"launcher_{stamp}_{in_file.stem}.log"
+                print("[run]", in_file.name, "->", out_file.name,
+                      f"(log: {region_log.name})", file=log)
+                fut = ex.submit(
+                    _run_one, in_file, out_file,
+                    args.delay_min, args.delay_max, args.retries, region_log,
+                )
+                futs[fut] = in_file
+
+            for fut in as_completed(futs):
+                in_file = futs[fut]
+                try:
+                    fut.result()
+                    print(f"[done] {in_file.name}", file=log)
+                except Exception as e:
+                    print(f"[X] {in_file.name}: {e}", file=log)
 
         print(f"\n[OK] Zakończono: {datetime.now():%Y-%m-%d %H:%M:%S}", file=log)
 
@@ -114,4 +149,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # wymagane pod Windows/PyInstaller, żeby procesy workerów wystartowały
+    multiprocessing.freeze_support()
     raise SystemExit(main())
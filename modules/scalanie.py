@@ -13,10 +13,45 @@ Jeśli nie podasz --base, użyje bieżącego katalogu roboczego.
 
 from __future__ import annotations
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 from datetime import datetime
 
+try:
+    import xlsxwriter  # noqa: F401  # szybszy zapis niż openpyxl
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
+
+def _read_csv_any(csv_path: Path) -> pd.DataFrame:
+    """
+    Parser CSV pyarrow czyta wielowątkowo i zwalnia GIL; pandas zostaje
+    jako fallback – także dla plików, których Excel zapisał w cp1250.
+    """
+    if pacsv is not None:
+        try:
+            # puste pola jako NA, jak w pd.read_csv
+            conv = pacsv.ConvertOptions(strings_can_be_null=True)
+            tab = pacsv.read_csv(str(csv_path), convert_options=conv)
+        except Exception:
+            tab = None  # np. pusty plik – niżej poradzi sobie pandas
+        # tekst spoza UTF-8 (cp1250 z Excela) arrow oddaje po cichu jako
+        # kolumny binarne zamiast zgłosić błąd – wtedy też schodzimy na pandas
+        if tab is not None and not any(pa.types.is_binary(f.type) for f in tab.schema):
+            return tab.to_pandas()
+    try:
+        return pd.read_csv(csv_path, encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        # awaryjnie spróbuj cp1250 (czasem Excel tak zapisze)
+        return pd.read_csv(csv_path, encoding="cp1250")
+
 
 def wczytaj_woj_csv(csv_path: Path) -> pd.DataFrame:
     """
@@ -24,11 +59,7 @@ def wczytaj_woj_csv(csv_path: Path) -> pd.DataFrame:
     Gwarantuje, że kolumny są zachowane tak jak w scraperze.
     Zwraca pusty DataFrame, jeśli plik jest pusty poza nagłówkiem.
     """
-    try:
-        df = pd.read_csv(csv_path, encoding="utf-8-sig")
-    except UnicodeDecodeError:
-        # awaryjnie spróbuj cp1250 (czasem Excel tak zapisze)
-        df = pd.read_csv(csv_path, encoding="cp1250")
+    df = _read_csv_any(csv_path)
 
     # dopisz kolumnę WOJEWODZTWO_ŹRÓDŁO jeśli nie ma (żeby w zbiorczym było wiadomo skąd rekord)
     woj_name = csv_path.stem  # np. "Podlaskie"
@@ -65,55 +96,69 @@ def scal_do_excela(base_dir: Path):
     arkusze: dict[str, pd.DataFrame] = {}
     all_rows = []
 
-    for csv_path in csv_files:
-        df = wczytaj_woj_csv(csv_path)
+    # standardowe kolumny - nagłówki normalizujemy do tego zestawu
+    std_cols = [
+        "cena","cena_za_metr","metry","liczba_pokoi","pietro","rynek","rok_budowy",
+        "material","wojewodztwo","powiat","gmina","miejscowosc",
+        "dzielnica","ulica","link"
+    ]
 
-        # normalizuj nagłówki - upewnij się że wszystkie standardowe kolumny są obecne
-        std_cols = [
-            "cena","cena_za_metr","metry","liczba_pokoi","pietro","rynek","rok_budowy",
-            "material","wojewodztwo","powiat","gmina","miejscowosc",
-            "dzielnica","ulica","link"
-        ]
-        for col in std_cols:
-            if col not in df.columns:
-                df[col] = ""
+    # wczytanie równolegle: parsowanie w pyarrow zwalnia GIL, więc wątki
+    # realnie nakładają IO i parse 16 plików na siebie
+    with ThreadPoolExecutor(max_workers=min(8, len(csv_files))) as ex:
+        ramki = list(ex.map(wczytaj_woj_csv, csv_files))
 
-        # zachowaj kolejność kolumn w arkuszach
-        df = df[std_cols]
+    for csv_path, df in zip(csv_files, ramki):
+        # upewnij się że wszystkie standardowe kolumny są obecne,
+        # w ustalonej kolejności (nadmiarowe odpadają)
+        df = df.reindex(columns=std_cols, fill_value="")
 
         woj_name = csv_path.stem  # nazwa arkusza np. "Dolnośląskie"
-        arkusze[woj_name] = df.copy()
-        all_rows.append(df.copy())
-
-    # scal wszystko w jedną ramkę
-    if all_rows:
-        df_all = pd.concat(all_rows, ignore_index=True)
-    else:
-        df_all = pd.DataFrame()
+        # df[std_cols] wyżej zwróciło już nową ramkę, a niżej tylko ją
+        # czytamy – kopie podwajałyby pamięć bez powodu
+        arkusze[woj_name] = df
+        all_rows.append(df)
+
+    # scal wszystko w jedną ramkę – jednym przebiegiem, bez kopii pośrednich
+    # (all_rows jest niepuste, bo brak CSV kończy funkcję wyżej)
+    df_all = pd.concat(all_rows, ignore_index=True)
+
+    # metadane w osobnym arkuszu INFO (opcjonalnie)
+    meta = pd.DataFrame(
+        {
+            "generated_at": [datetime.now().isoformat(timespec="seconds")],
+            "source_folder": [str(woj_dir)],
+            "num_regions": [len(arkusze)],
+            "total_rows": [len(df_all)],
+        }
+    )
 
     # zapisz do Excela:
     # - każdy województwo jako osobny sheet
     # - na końcu sheet "Polska" z całością
-    with pd.ExcelWriter(out_xlsx, engine="openpyxl") as writer:
-        # pojedyncze województwa
-        for sheet_name, df in arkusze.items():
-            # Excel nie lubi bardzo długich nazw arkuszy >31 znaków, więc przytnij w razie czego
-            safe_name = sheet_name[:31]
-            df.to_excel(writer, sheet_name=safe_name, index=False)
-
-        # zbiorczy
-        df_all.to_excel(writer, sheet_name="Polska", index=False)
-
-        # dodaj metadane w pustym arkuszu INFO (opcjonalnie)
-        meta = pd.DataFrame(
-            {
-                "generated_at": [datetime.now().isoformat(timespec="seconds")],
-                "source_folder": [str(woj_dir)],
-                "num_regions": [len(arkusze)],
-                "total_rows": [len(df_all)],
-            }
-        )
-        meta.to_excel(writer, sheet_name="INFO", index=False)
+    # Excel nie lubi bardzo długich nazw arkuszy >31 znaków, więc przycinamy
+    do_zapisu = list(arkusze.items()) + [("Polska", df_all), ("INFO", meta)]
+
+    if xlsxwriter is not None:
+        # xlsxwriter serializuje wiersze bez budowania obiektów komórek,
+        # więc na kilkunastu arkuszach jest wyraźnie szybszy od openpyxl
+        with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as writer:
+            for sheet_name, df in do_zapisu:
+                df.to_excel(writer, sheet_name=sheet_name[:31], index=False)
+    else:
+        # fallback: openpyxl w trybie write_only – wiersze lecą od razu do
+        # pliku tymczasowego, bez grafu komórek w pamięci
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for sheet_name, df in do_zapisu:
+            ws = wb.create_sheet(sheet_name[:31])
+            ws.append(list(df.columns))
+            out = df.astype(object)
+            out[pd.isna(out)] = None  # NaN → pusta komórka, jak w to_excel
+            for row in out.itertuples(index=False, name=None):
+                ws.append(row)
+        wb.save(out_xlsx)
 
     print(f"[OK] Zapisano plik Excel: {out_xlsx}")
 
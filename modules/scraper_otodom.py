@@ -12,8 +12,18 @@ from __future__ import annotations
 import argparse, csv, re, sys, time
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from bs4 import BeautifulSoup
 
+try:
+    # lxml wyciąga href-y w C, bez budowania drzewa bs4 per strona
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+if lxml_html is not None:
+    _HREFS_XPATH = etree.XPath("//a/@href")
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -24,6 +34,16 @@ HEADERS = {
     "Referer": "https://www.otodom.pl/",
 }
 
+# jedna sesja na cały crawl: keep-alive oszczędza handshake TCP+TLS na
+# każdej stronie, a retry w adapterze wraca na już otwarte połączenie
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+))
+
 VOIVODESHIP_SLUG = {
     "Dolnośląskie": "dolnoslaskie",
     "Kujawsko-Pomorskie": "kujawsko--pomorskie",
@@ -49,6 +69,9 @@ def resolve_desktop_dir() -> Path:
         if d.exists(): return d
     return home
 
+# kompilacja raz na import – normalize_url leci 72×+ na stronę
+_MULTISLASH_RE = re.compile(r"https://www\.otodom\.pl/+")
+
 def normalize_url(u: str) -> str | None:
     if not u: return None
     u = u.strip()
@@ -61,14 +84,26 @@ def normalize_url(u: str) -> str | None:
         u = "https://" + u
     # kanon + pojedynczy ukośnik
     u = u.replace("https://www.otodom.pl/hpr", "https://www.otodom.pl")
-    u = re.sub(r"https://www\.otodom\.pl/+", "https://www.otodom.pl/", u)
+    u = _MULTISLASH_RE.sub("https://www.otodom.pl/", u)
     # tylko oferty
     return u if "/pl/oferta/" in u else None
 
-def fetch(url: str) -> BeautifulSoup:
-    r = requests.get(url, headers=HEADERS, timeout=30)
+def fetch(url: str) -> str:
+    r = SESSION.get(url, timeout=30)
     r.raise_for_status()
-    return BeautifulSoup(r.text, "lxml")
+    return r.text
+
+def extract_offer_links(html: str) -> set[str]:
+    """Znormalizowane linki ofert ze wszystkich <a> na stronie wyników."""
+    if lxml_html is not None:
+        try:
+            hrefs = _HREFS_XPATH(lxml_html.fromstring(html))
+        except Exception:
+            hrefs = None
+        if hrefs is not None:
+            return {u for u in map(normalize_url, hrefs) if u}
+    soup = BeautifulSoup(html, "html.parser")
+    return {u for u in (normalize_url(a.get("href", "")) for a in soup.select("a")) if u}
 
 def main():
     ap = argparse.ArgumentParser()
@@ -93,16 +128,10 @@ def main():
     print(f"[start] region='{slug}' type='{args.type}' output='{out_path}'")
     while page <= args.max_pages and no_new_pages < 2:
         url = f"https://www.otodom.pl/pl/wyniki/sprzedaz/{args.type}/{slug}?limit=72&ownerTypeSingleSelect=ALL&by=DEFAULT&direction=DESC&page={page}"
-        soup = fetch(url)
+        html = fetch(url)
 
         # linki z kafelków
-        found = set()
-        for a in soup.select("a"):
-            href = a.get("href", "")
-            if not href: continue
-            u = normalize_url(href)
-            if not u: continue
-            found.add(u)
+        found = extract_offer_links(html)
 
         new = [u for u in found if u not in seen]
         seen.update(new)
@@ -119,9 +148,8 @@ def main():
     # zapis bez nagłówka – jeden URL na linię
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        for u in sorted(seen):
-            w.writerow([u])
+        # writerows schodzi do C po jednej liście zamiast writerow per link
+        csv.writer(f).writerows([u] for u in sorted(seen))
 
     print(f"[done] zapisano {len(seen)} linków do {out_path}")
 
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Testy regresyjne uzupełniania adresów (CzyszczenieAdresu)."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+_MODULES = Path(__file__).resolve().parents[1] / "modules"
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("cz", _MODULES / "CzyszczenieAdresu.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["cz"] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _add_helper_cols(cz, df, cols):
+    """Kolumny znormalizowane tak, jak robi to clean_report/load_teryt."""
+    for col, n in cols:
+        df[n] = cz._norm_series(df[col])
+    return df
+
+
+def test_norm_series_keeps_values_on_rows_with_non_default_index():
+    """Wynik z pyarrow ma świeży RangeIndex – bez zdjęcia indeksu konstruktor
+    Series dopasowywał wartości po etykietach i mieszał wiersze."""
+    cz = _load_module()
+
+    s = pd.Series(["Gdańsk", "Warszawa", "Sopot"], index=[2, 0, 5])
+    expected = {2: "gdansk", 0: "warszawa", 5: "sopot"}
+
+    assert cz._norm_series(s).to_dict() == expected
+
+    # gałąź czysto-pandasowa musi dawać to samo
+    cz.pc = None
+    assert cz._norm_series(s).to_dict() == expected
+
+
+def test_fill_powiat_from_woj_gmina_without_powiat():
+    """Wiersz z Województwem+Gminą, ale pustym Powiatem, musi dostać Powiat
+    z klucza (woj, gmina) – poziomy gminowe bez pow_n w KEY_LEVELS."""
+    cz = _load_module()
+
+    teryt = pd.DataFrame({
+        "Wojewodztwo": ["Pomorskie", "Pomorskie", "Pomorskie"],
+        "Powiat": ["POWIAT0-POM", "POWIAT0-POM", "INNY"],
+        "Gmina": ["Gmina Testowa", "Gmina Testowa", "Gmina Inna"],
+        "Miejscowosc": ["Wieś A", "Wieś B", "Wieś C"],
+        "Dzielnica": ["", "", ""],
+    })
+    _add_helper_cols(cz, teryt, [
+        ("Wojewodztwo", "woj_n"), ("Powiat", "pow_n"), ("Gmina", "gmi_n"),
+        ("Miejscowosc", "miej_n"), ("Dzielnica", "dz_n"),
+    ])
+    teryt["miej_base"] = teryt["Miejscowosc"].map(cz._place_base)
+    teryt["gmi_base"] = teryt["Gmina"].map(cz._place_base)
+
+    df = pd.DataFrame({
+        "Województwo": ["Pomorskie"],
+        "Powiat": [""],
+        "Gmina": ["Gmina Testowa"],
+        "Miejscowość": [""],
+        "Dzielnica": [""],
+    })
+    _add_helper_cols(cz, df, [
+        ("Województwo", "woj_n"), ("Powiat", "pow_n"), ("Gmina", "gmi_n"),
+        ("Miejscowość", "miej_n"), ("Dzielnica", "dz_n"),
+    ])
+    df["miej_base"] = df["Miejscowość"].map(cz._place_base)
+    df["gmi_base"] = df["Gmina"].map(cz._place_base)
+
+    teryt_map = {"Wojewodztwo": "Województwo", "Miejscowosc": "Miejscowość"}
+    out = cz._merge_fill(df, cz._build_lookups(teryt, teryt_map))
+
+    assert out.loc[0, "Powiat"] == "POWIAT0-POM"
+    # miejscowość jest w tej gminie niejednoznaczna – nie wolno zgadywać
+    assert out.loc[0, "Miejscowość"] == ""
+    # istniejące wartości pozostają nietknięte
+    assert out.loc[0, "Gmina"] == "Gmina Testowa"
+    assert out.loc[0, "Województwo"] == "Pomorskie"
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Testy regresyjne czyszczenia bazy danych (czyszczeniebazydanych)."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+_MODULES = Path(__file__).resolve().parents[1] / "modules"
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("bz", _MODULES / "czyszczeniebazydanych.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["bz"] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_norm_series_keeps_values_on_rows_with_non_default_index():
+    """Wynik z pyarrow ma świeży RangeIndex – bez zdjęcia indeksu konstruktor
+    Series dopasowywał wartości po etykietach i mieszał wiersze."""
+    bz = _load_module()
+
+    s = pd.Series(["Gdańsk", "Warszawa", "Sopot"], index=[2, 0, 5])
+    expected = {2: "gdansk", 0: "warszawa", 5: "sopot"}
+
+    assert bz.norm_series(s).to_dict() == expected
+
+    # gałąź czysto-pandasowa musi dawać to samo
+    bz.pc = None
+    assert bz.norm_series(s).to_dict() == expected
+
+
+def _teryt_cols():
+    return dict(W="W", P="P", G="G", M="M", D="D", U="U",
+                TW="TW", TP="TP", TG="TG", TM="TM", TD="TD", TU="TU")
+
+
+def test_fill_from_teryt_survives_filter_dropping_leading_rows():
+    """Prefiltr po miejscowości tnie początek ramki TERYT (niedomyślny
+    indeks) – dopasowane wartości muszą zostać przy właściwych wierszach."""
+    bz = _load_module()
+
+    teryt = pd.DataFrame({
+        "TM": ["Inne Miasto", "Inne Miasto", "Sopot", "Sopot"],
+        "TD": [None, None, None, None],
+        "TU": [None, None, "Krótka", "Krótka"],
+        "TW": ["Dolnośląskie", "Dolnośląskie", "Pomorskie", "Pomorskie"],
+        "TP": ["X", "X", "Sopot", "Sopot"],
+        "TG": ["Y", "Y", "Sopot", "Sopot"],
+    })
+    df = pd.DataFrame({
+        "W": [None], "P": [None], "G": [None],
+        "M": ["Sopot"], "D": [None], "U": [None],
+    })
+    bz.fill_from_teryt(df, teryt, **_teryt_cols())
+
+    row = df.iloc[0]
+    assert row["W"] == "pomorskie"
+    assert row["P"] == "sopot"
+    assert row["G"] == "sopot"
+    assert row["U"] == "ul. krotka"
+
+
+def test_fill_from_teryt_does_not_write_ul_nan_for_ambiguous_street():
+    """Kandydaci z merge mają braki jako NaN – niejednoznaczna ulica nie może
+    trafić do kolumny jako dosłowne 'ul. nan'."""
+    bz = _load_module()
+
+    teryt = pd.DataFrame({
+        "TM": ["Przodkowo", "Sopot", "Sopot"],
+        "TD": [None, None, None],
+        "TU": [None, "Krótka", "Długa"],
+        "TW": ["Pomorskie", "Pomorskie", "Pomorskie"],
+        "TP": ["kartuski", "Sopot", "Sopot"],
+        "TG": ["Przodkowo", "Sopot", "Sopot"],
+    })
+    df = pd.DataFrame({
+        "W": [None], "P": [None], "G": [None],
+        "M": ["Sopot"], "D": [None], "U": [None],
+    })
+    bz.fill_from_teryt(df, teryt, **_teryt_cols())
+
+    row = df.iloc[0]
+    # adres uzupełniony, ulica zostaje pusta zamiast "ul. nan"
+    assert row["W"] == "pomorskie"
+    assert pd.isna(row["U"])
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Testy regresyjne łatki nagłówków raportu (kolumny.ensure_report_columns)."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+
+_MODULES = Path(__file__).resolve().parents[1] / "modules"
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("kol", _MODULES / "kolumny.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["kol"] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_patched_headers_visible_in_read_only_mode(tmp_path):
+    """openpyxl w trybie read_only ufa <dimension> – po łatce ZIP musi
+    widzieć wszystkie dopisane nagłówki, nie tylko starą szerokość."""
+    kol = _load_module()
+
+    xlsx = tmp_path / "raport.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "raport"
+    ws.append(["Nr KW", "Województwo", "a", "b", "c", "d", "e", "f"])
+    ws.append(["KW1/1", "Mazowieckie", 1, 2, 3, 4, 5, 6])
+    wb.create_sheet("raport_odfiltrowane").append(["x"])
+    wb.save(xlsx)
+
+    kol.ensure_report_columns(xlsx)
+
+    target = kol.REQ_COLS + kol.VALUE_COLS
+    ro = load_workbook(xlsx, read_only=True)
+    try:
+        row1 = [c.value for c in next(ro["raport"].iter_rows(min_row=1, max_row=1))]
+    finally:
+        ro.close()
+    assert all(name in row1 for name in target)
+
+    # tryb zwykły widzi dokładnie to samo, a dane pod nagłówkiem są nietknięte
+    full = load_workbook(xlsx)
+    assert [c.value for c in full["raport"][1]] == row1
+    assert [c.value for c in full["raport"][2]][:2] == ["KW1/1", "Mazowieckie"]
+    assert full.sheetnames == ["raport", "raport_odfiltrowane"]